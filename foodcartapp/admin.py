@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.shortcuts import reverse
-from django.templatetags.static import static
 from django.utils.html import format_html
 
 from .models import Product
@@ -8,9 +7,18 @@ from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import Order, OrderProducts
+from .models import ArchivedOrder, ArchivedOrderProducts
+from .models import Banner
+from .search import search_products, search_restaurants
 
 from django import forms
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
 from django.shortcuts import redirect
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.http import HttpResponseRedirect
@@ -18,9 +26,110 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 
 
-class RestaurantMenuItemInline(admin.TabularInline):
+class EstimatedCountPaginator(Paginator):
+    """Не считает COUNT(*) по всей большой таблице PostgreSQL, а берёт оценку планировщика
+
+    Точный счёт остаётся для отфильтрованных списков, небольших таблиц и
+    других СУБД, где такой оценки нет.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return super().count
+
+        estimated_count = self.estimate_count(queryset)
+        if estimated_count is None or estimated_count < self.exact_count_limit:
+            return super().count
+        return estimated_count
+
+    def estimate_count(self, queryset):
+        """Число строк по статистике PostgreSQL или None, если оценки нет"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # До первого ANALYZE reltuples равно -1 или 0
+        if not row or row[0] <= 0:
+            return None
+        return row[0]
+
+
+class PrefetchedAutocompleteSelect(AutocompleteSelect):
+    """Подписывает выбранное значение уже загруженным объектом, а не запросом на каждую строку"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Копии виджета в формах одного формсета делят этот словарь
+        self.known_objects = {}
+
+    def optgroups(self, name, value, attr=None):
+        empty_values = self.choices.field.empty_values
+        selected_objects = [
+            self.known_objects.get(str(selected_value))
+            for selected_value in value
+            if str(selected_value) not in empty_values
+        ]
+        if not selected_objects or None in selected_objects:
+            return super().optgroups(name, value, attr)
+
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for obj in selected_objects:
+            label = self.choices.field.label_from_instance(obj)
+            options.append(self.create_option(name, obj.pk, label, True, len(options)))
+        return [(None, options, 0)]
+
+
+class PrefetchedAutocompleteFormSet(BaseInlineFormSet):
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, PrefetchedAutocompleteSelect):
+                continue
+            model_field = form.instance._meta.get_field(name)
+            if model_field.is_cached(form.instance):
+                related_object = model_field.get_cached_value(form.instance)
+                if related_object is not None:
+                    widget.known_objects[str(related_object.pk)] = related_object
+        return form
+
+
+class PrefetchedAutocompleteInline(admin.TabularInline):
+    """Инлайн с автодополнением, который берёт выбранные объекты из select_related"""
+    formset = PrefetchedAutocompleteFormSet
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs.setdefault('widget', PrefetchedAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            ))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class RestaurantMenuItemInline(PrefetchedAutocompleteInline):
     model = RestaurantMenuItem
     extra = 0
+    # Выпадающие списки грузили бы все товары и рестораны в каждую строку
+    autocomplete_fields = [
+        'restaurant',
+        'product',
+    ]
+
+    def get_queryset(self, request):
+        # __str__ пункта меню обращается и к ресторану, и к товару
+        return super().get_queryset(request).select_related('restaurant', 'product')
 
 
 @admin.register(Restaurant)
@@ -34,11 +143,20 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'delivery_radius',
+    ]
+    ordering = [
+        'name',
     ]
     inlines = [
         RestaurantMenuItemInline
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_restaurants(search_term, queryset), False
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -51,15 +169,20 @@ class ProductAdmin(admin.ModelAdmin):
     list_display_links = [
         'name',
     ]
+    list_select_related = [
+        'category',
+    ]
     list_filter = [
         'category',
     ]
+    # Ищем по поисковому индексу, см. get_search_results
     search_fields = [
-        # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
-        # Migration to PostgreSQL is necessary
         'name',
         'category__name',
     ]
+    ordering = [
+        'name',
+    ]
 
     inlines = [
         RestaurantMenuItemInline
@@ -92,23 +215,28 @@ class ProductAdmin(admin.ModelAdmin):
     class Media:
         css = {
             "all": (
-                static("admin/foodcartapp.css")
+                "admin/foodcartapp.css",
             )
         }
 
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.get_thumbnail_url('medium'))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.get_thumbnail_url())
     get_image_list_preview.short_description = 'превью'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_products(search_term, queryset), False
+
 
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
@@ -132,14 +260,63 @@ class OrderProductsForm(forms.ModelForm):
                 raise ValidationError(f"Нет товара {product.name}")
         return cleaned_info
 
-class OrderProductsInline(admin.TabularInline):
+class OrderProductsInline(PrefetchedAutocompleteInline):
     model = OrderProducts
     extra = 1
     form = OrderProductsForm
+    autocomplete_fields = [
+        'product',
+    ]
+
+    def get_queryset(self, request):
+        # __str__ позиции заказа обращается и к заказу, и к товару
+        return super().get_queryset(request).select_related('order', 'product')
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderProductsInline]
+    autocomplete_fields = [
+        'restaurant',
+    ]
+    list_display = [
+        'id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+        'status',
+        'restaurant',
+        'created_at',
+    ]
+    # Каждый фильтр и сортировка опираются на индексы Order
+    list_filter = [
+        'status',
+        'restaurant',
+        'created_at',
+    ]
+    list_select_related = [
+        'restaurant',
+    ]
+    search_fields = [
+        'id',
+        'phonenumber',
+    ]
+    ordering = [
+        '-created_at',
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Стандартный поиск приводит id к строке и не попадает в индексы
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        lookup = Q(phonenumber=search_term)
+        if search_term.isdigit():
+            lookup |= Q(pk=int(search_term))
+        return queryset.filter(lookup), False
 
     def save_formset(self, request, form, formset, change):
         instances = formset.save(commit=False)
@@ -179,3 +356,67 @@ class OrderAdmin(admin.ModelAdmin):
                 return HttpResponseRedirect(redirect_url)
 
         return super().response_change(request, obj)
+
+
+class ArchivedOrderProductsInline(admin.TabularInline):
+    model = ArchivedOrderProducts
+    extra = 0
+    can_delete = False
+    readonly_fields = ['product', 'quantity', 'price']
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['id', 'firstname', 'lastname', 'address', 'created_at', 'archived_at']
+    list_select_related = ['restaurant']
+    search_fields = ['id', 'phonenumber']
+    date_hierarchy = 'created_at'
+    show_full_result_count = False
+    inlines = [ArchivedOrderProductsInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'position',
+        'active_from',
+        'active_until',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'position',
+    ]
+    readonly_fields = [
+        'get_image_preview',
+    ]
+    fields = [
+        'title',
+        'text',
+        'image',
+        'get_image_preview',
+        'position',
+        'active_from',
+        'active_until',
+    ]
+
+    def get_image_preview(self, obj):
+        if not obj.image:
+            return 'выберите картинку'
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+    get_image_preview.short_description = 'превью'
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderProducts, Order, OrderProducts
+
+
+ARCHIVED_ORDER_FIELDS = [
+    'id',
+    'firstname',
+    'lastname',
+    'phonenumber',
+    'address',
+    'status',
+    'comment_from_manager',
+    'created_at',
+    'called_at',
+    'delivered_at',
+    'payment_method',
+    'restaurant_id',
+]
+
+
+def get_archivable_orders(older_than_days):
+    """Выполненные заказы, доставленные (или созданные) раньше указанного срока"""
+    border = timezone.now() - timedelta(days=older_than_days)
+    return (
+        Order.objects
+        .filter(status='V')
+        .filter(
+            Q(delivered_at__lt=border)
+            | Q(delivered_at__isnull=True, created_at__lt=border)
+        )
+    )
+
+
+@transaction.atomic
+def archive_orders_batch(order_ids, older_than_days):
+    """Переносит пачку заказов в архив одной транзакцией, возвращает число перенесённых"""
+    archived_at = timezone.now()
+    # После выборки id заказ могли вернуть в работу, поэтому условия проверяются снова под блокировкой
+    orders = list(
+        get_archivable_orders(older_than_days)
+        .filter(pk__in=order_ids)
+        .select_for_update()
+        .values(*ARCHIVED_ORDER_FIELDS)
+    )
+    order_ids = [order['id'] for order in orders]
+    ArchivedOrder.objects.bulk_create([
+        ArchivedOrder(archived_at=archived_at, **order) for order in orders
+    ])
+
+    order_products = (
+        OrderProducts.objects
+        .filter(order_id__in=order_ids)
+        .values('order_id', 'product_id', 'quantity', 'price')
+    )
+    ArchivedOrderProducts.objects.bulk_create([
+        ArchivedOrderProducts(**order_product) for order_product in order_products
+    ])
+
+    OrderProducts.objects.filter(order_id__in=order_ids).delete()
+    Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders)
+
+
+def archive_orders(older_than_days, batch_size=500):
+    """Архивирует старые выполненные заказы пачками, возвращает их количество"""
+    archived_count = 0
+    while True:
+        order_ids = list(
+            get_archivable_orders(older_than_days)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return archived_count
+        archived_count += archive_orders_batch(order_ids, older_than_days)
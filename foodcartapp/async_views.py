@@ -0,0 +1,66 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.serializers import ValidationError
+
+from metrics.registry import registry
+
+from .idempotency import get_idempotency_key, get_stored_response
+from .throttling import OrderThrottle, get_order_wait, get_phonenumber
+from .views import dump_product, get_catalogue_products, save_order, wants_minimal_response
+
+
+async def product_list_api(request):
+    dumped_products = [
+        dump_product(product) async for product in get_catalogue_products()
+    ]
+    return JsonResponse(dumped_products, safe=False, json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+@csrf_exempt
+@require_POST
+async def register_order(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError as error:
+        return JsonResponse({'detail': f'JSON parse error - {error}'}, status=400)
+
+    try:
+        idempotency_key = get_idempotency_key(request.headers)
+    except ValidationError as error:
+        return JsonResponse(error.detail, status=400, safe=False)
+    minimal = wants_minimal_response(request.headers)
+    # Повтор после таймаута должен узнать, что заказ принят, даже если клиент исчерпал лимит
+    stored_response = idempotency_key and await sync_to_async(get_stored_response)(idempotency_key, data, minimal)
+    if stored_response:
+        serialized_info, response_status = stored_response
+        return JsonResponse(serialized_info, status=response_status)
+
+    # Кэш и журнал приёма заказов читаются синхронно, поэтому не в цикле событий
+    wait = await sync_to_async(get_order_wait)(OrderThrottle().get_ident(request), get_phonenumber(data))
+    if wait:
+        return JsonResponse(
+            {'detail': f'Слишком много запросов. Повторите через {wait} с.'},
+            status=429,
+            headers={'Retry-After': str(wait)},
+        )
+
+    with registry.time('starburger_register_order_seconds'):
+        try:
+            # Транзакций в асинхронном ORM нет, поэтому запись идёт в пуле потоков
+            serialized_info, response_status = await sync_to_async(save_order)(
+                data,
+                idempotency_key,
+                minimal,
+            )
+        except ValidationError as error:
+            return JsonResponse(error.detail, status=400, safe=False)
+
+    registry.inc('starburger_orders_registered_total')
+    return JsonResponse(serialized_info, status=response_status)
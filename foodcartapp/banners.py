@@ -0,0 +1,73 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.templatetags.static import static
+from django.utils import timezone
+
+from .models import Banner
+
+
+BANNERS_CACHE_KEY = 'banners'
+BANNERS_CACHE_TIMEOUT = 60 * 60
+# Картинки лежат в assets. Пока в админке нет ни одного баннера, показываются эти
+STARTER_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def dump_banner(banner):
+    return {
+        'title': banner.title,
+        'src': banner.image.url,
+        'text': banner.text,
+    }
+
+
+def dump_starter_banners():
+    return [
+        {'title': title, 'src': static(filename), 'text': text}
+        for title, filename, text in STARTER_BANNERS
+    ]
+
+
+def get_seconds_until_change(banners, now):
+    """Через сколько секунд у какого-то баннера начнётся или закончится показ"""
+    borders = [
+        border
+        for banner in banners
+        for border in (banner.active_from, banner.active_until)
+        if border and border > now
+    ]
+    if not borders:
+        return BANNERS_CACHE_TIMEOUT
+    return min(BANNERS_CACHE_TIMEOUT, max(1, int((min(borders) - now).total_seconds())))
+
+
+def get_banners_content():
+    """Возвращает готовый JSON со списком баннеров и его ETag"""
+    cached = cache.get(BANNERS_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    now = timezone.now()
+    banners = list(Banner.objects.all())
+    if banners:
+        dumped_banners = [dump_banner(banner) for banner in banners if banner.is_active(now)]
+    else:
+        dumped_banners = dump_starter_banners()
+    content = json.dumps(
+        dumped_banners,
+        ensure_ascii=False,
+        indent=4,
+    ).encode()
+    etag = '"{0}"'.format(hashlib.md5(content).hexdigest())
+
+    cache.set(BANNERS_CACHE_KEY, (content, etag), get_seconds_until_change(banners, now))
+    return content, etag
+
+
+def invalidate_banners():
+    cache.delete(BANNERS_CACHE_KEY)
@@ -0,0 +1,131 @@
+"""Зоны доставки ресторанов.
+
+Зона доставки — круг заданного радиуса вокруг ресторана. Заранее
+считается, какие ячейки geohash этот круг задевает, и ячейки хранятся
+в БД с индексом. Тогда для адреса заказа достаточно вычислить его ячейку,
+и одним запросом по индексу получить рестораны, которые могут туда
+доставлять, не перебирая остальные.
+
+Ячейки берутся с запасом, поэтому расстояние до найденных ресторанов всё
+равно нужно проверить. Зоны не переходят через 180-й меридиан.
+"""
+import math
+from collections import defaultdict
+
+from geoinfostore.models import Address
+
+from .models import DeliveryZoneCell
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Ячейка 5 знаков — около 4,9 × 4,9 км на экваторе и 2,7 × 4,9 км в Москве
+DELIVERY_ZONE_PRECISION = 5
+EARTH_RADIUS_KM = 6371.0
+# Гаверсинус отличается от геодезического расстояния geopy до 0,5%
+COVERAGE_MARGIN = 1.01
+
+
+def encode_geohash(latitude, longitude, precision=DELIVERY_ZONE_PRECISION):
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash = []
+    bits, bits_count, is_longitude = 0, 0, True
+    while len(geohash) < precision:
+        value_range, value = (longitude_range, longitude) if is_longitude else (latitude_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        is_longitude = not is_longitude
+        bits_count += 1
+        if bits_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bits_count = 0, 0
+    return ''.join(geohash)
+
+
+def get_cell_size(precision=DELIVERY_ZONE_PRECISION):
+    """Высота и ширина ячейки в градусах"""
+    bits_count = 5 * precision
+    latitude_bits, longitude_bits = bits_count // 2, (bits_count + 1) // 2
+    return 180 / 2 ** latitude_bits, 360 / 2 ** longitude_bits
+
+
+def haversine_distance(first_coords, second_coords):
+    """Расстояние в км по дуге большого круга"""
+    first_latitude, first_longitude = map(math.radians, first_coords)
+    second_latitude, second_longitude = map(math.radians, second_coords)
+    a = (
+        math.sin((second_latitude - first_latitude) / 2) ** 2
+        + math.cos(first_latitude) * math.cos(second_latitude)
+        * math.sin((second_longitude - first_longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def get_zone_cells(latitude, longitude, radius, precision=DELIVERY_ZONE_PRECISION):
+    """Ячейки geohash, которые задевает круг радиусом radius км"""
+    latitude_step, longitude_step = get_cell_size(precision)
+    radius *= COVERAGE_MARGIN
+    latitude_delta = math.degrees(radius / EARTH_RADIUS_KM)
+    # Дальний от экватора край круга шире всего по долготе
+    widest_latitude = min(89.0, abs(latitude) + latitude_delta)
+    longitude_delta = latitude_delta / math.cos(math.radians(widest_latitude))
+
+    first_row = math.floor((max(-90.0, latitude - latitude_delta) + 90) / latitude_step)
+    last_row = math.floor((min(89.999999, latitude + latitude_delta) + 90) / latitude_step)
+    first_column = math.floor((max(-180.0, longitude - longitude_delta) + 180) / longitude_step)
+    last_column = math.floor((min(179.999999, longitude + longitude_delta) + 180) / longitude_step)
+
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        south = row * latitude_step - 90
+        north = south + latitude_step
+        for column in range(first_column, last_column + 1):
+            west = column * longitude_step - 180
+            east = west + longitude_step
+            nearest_point = (
+                min(max(latitude, south), north),
+                min(max(longitude, west), east),
+            )
+            if haversine_distance((latitude, longitude), nearest_point) <= radius:
+                cells.add(encode_geohash(south + latitude_step / 2, west + longitude_step / 2, precision))
+    return cells
+
+
+def update_delivery_zones(restaurants):
+    """Пересчитывает ячейки зон доставки по координатам адресов ресторанов"""
+    restaurants = list(restaurants)
+    addresses = Address.objects.with_coordinates().filter(
+        raw_address__in=[
+            restaurant.address for restaurant in restaurants
+            if restaurant.delivery_radius and restaurant.address
+        ],
+    )
+    coords_by_address = {address.raw_address: address.coordinates for address in addresses}
+
+    DeliveryZoneCell.objects.filter(restaurant__in=restaurants).delete()
+    DeliveryZoneCell.objects.bulk_create([
+        DeliveryZoneCell(restaurant=restaurant, geohash=geohash)
+        for restaurant in restaurants
+        if restaurant.delivery_radius and restaurant.address in coords_by_address
+        for geohash in get_zone_cells(*coords_by_address[restaurant.address], restaurant.delivery_radius)
+    ])
+
+
+def get_restaurant_ids_by_cell(cells):
+    """Какие рестораны доставляют в каждую из ячеек, одним запросом"""
+    restaurant_ids_by_cell = defaultdict(set)
+    if not cells:
+        return restaurant_ids_by_cell
+
+    zone_cells = (
+        DeliveryZoneCell.objects
+        .filter(geohash__in=set(cells))
+        .values_list('geohash', 'restaurant_id')
+    )
+    for geohash, restaurant_id in zone_cells:
+        restaurant_ids_by_cell[geohash].add(restaurant_id)
+    return restaurant_ids_by_cell
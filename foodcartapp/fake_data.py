@@ -0,0 +1,100 @@
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import (
+    Order,
+    OrderProducts,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .search import index_products, index_restaurants
+
+
+ORDER_STATUS_WEIGHTS = {
+    'U': 3,
+    'S': 3,
+    'D': 2,
+    'V': 92,
+}
+
+
+def create_menu(restaurants_count, products_count, seed=None):
+    """Создаёт рестораны, товары и меню ресторанов для замеров"""
+    rnd = random.Random(seed)
+
+    category = ProductCategory.objects.create(name='Бургеры')
+    restaurants = Restaurant.objects.bulk_create([
+        Restaurant(
+            name=f'Star Burger {number}',
+            address=f'Москва, улица Бургерная, {number}',
+        )
+        for number in range(1, restaurants_count + 1)
+    ])
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Бургер {number}',
+            category=category,
+            price=rnd.randint(100, 900),
+            image='burger.jpg',
+        )
+        for number in range(1, products_count + 1)
+    ])
+    RestaurantMenuItem.objects.bulk_create([
+        RestaurantMenuItem(
+            restaurant=restaurant,
+            product=product,
+            price=product.price,
+            availability=rnd.random() > 0.1,
+        )
+        for restaurant in restaurants
+        for product in products
+    ])
+    # bulk_create не вызывает сигналы, которые обновляют поисковый индекс
+    index_restaurants(restaurants)
+    index_products(products)
+    return restaurants, products
+
+
+def create_orders(count, restaurants, products, batch_size=10000, seed=None,
+                  max_order_lines=3, days=365):
+    """Создаёт заказы пачками; большая часть из них уже выполнена"""
+    rnd = random.Random(seed)
+    statuses = list(ORDER_STATUS_WEIGHTS)
+    weights = list(ORDER_STATUS_WEIGHTS.values())
+    now = timezone.now()
+
+    created_count = 0
+    while created_count < count:
+        orders = []
+        for _ in range(min(batch_size, count - created_count)):
+            status = rnd.choices(statuses, weights)[0]
+            created_at = now - timedelta(minutes=rnd.randint(0, days * 24 * 60))
+            orders.append(Order(
+                firstname='Иван',
+                lastname='Петров',
+                phonenumber='+79161234567',
+                address=f'Москва, улица Ленина, {rnd.randint(1, 200)}',
+                status=status,
+                created_at=created_at,
+                delivered_at=created_at + timedelta(hours=1) if status == 'V' else None,
+                restaurant=rnd.choice(restaurants) if status != 'U' else None,
+            ))
+        orders = Order.objects.bulk_create(orders)
+
+        OrderProducts.objects.bulk_create([
+            OrderProducts(
+                order=order,
+                product=product,
+                quantity=rnd.randint(1, 3),
+                price=product.price,
+            )
+            for order in orders
+            for product in rnd.sample(products, rnd.randint(1, max_order_lines))
+        ])
+        created_count += len(orders)
+
+    return created_count
@@ -0,0 +1,129 @@
+"""Повторы запросов на оформление заказа.
+
+Мобильное приложение повторяет POST /api/order/ по таймауту. Если клиент
+прислал заголовок Idempotency-Key, ответ сохраняется под этим ключом в той же
+транзакции, что и заказ, а повтор с тем же ключом получает сохранённый ответ
+одним запросом по индексу, без проверки данных и новой записи в БД.
+
+Ключ действует в пределах номера телефона из заказа, а вместе с ответом
+хранится хэш тела запроса. Если ключ пришёл с другими данными, клиент
+получает 422, а не чужой ответ с именем и адресом другого покупателя.
+
+Журнал приёма заказов откатить нельзя, поэтому там ключ сначала занимается
+без ответа, а ответ сохраняется, только когда заказ записан в журнал. Повтор,
+пришедший в этот промежуток, получает 409.
+"""
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.serializers import ValidationError
+
+from .models import OrderIdempotencyKey
+from .throttling import get_phonenumber
+
+
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+KEY_REUSED_RESPONSE = {
+    IDEMPOTENCY_KEY_HEADER: ['Ключ уже использован для другого заказа.'],
+}
+IN_PROGRESS_RESPONSE = {'detail': 'Запрос с этим ключом ещё обрабатывается, повторите его позже.'}
+# Если ключ занят дольше, занявший его процесс упал, не записав заказ
+RESERVED_KEY_TIMEOUT = 60
+
+
+def get_idempotency_key(headers):
+    key = headers.get(IDEMPOTENCY_KEY_HEADER)
+    if key is None:
+        return None
+    max_length = OrderIdempotencyKey._meta.get_field('key').max_length
+    if not key or len(key) > max_length:
+        raise ValidationError({
+            IDEMPOTENCY_KEY_HEADER: [f'Ключ должен быть непустой строкой до {max_length} символов.'],
+        })
+    return key
+
+
+def get_expiry_threshold():
+    return timezone.now() - timedelta(seconds=settings.ORDER_IDEMPOTENCY_KEY_TTL)
+
+
+def get_key_scope(data):
+    """Ключ действует в пределах номера телефона, чтобы ключи разных клиентов не пересекались"""
+    return re.sub(r'\D', '', str(get_phonenumber(data) or ''))
+
+
+def get_request_hash(data):
+    """Хэш тела запроса: повтор с тем же ключом должен прийти с теми же данными"""
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def filter_keys(key, data):
+    return OrderIdempotencyKey.objects.filter(scope=get_key_scope(data), key=key)
+
+
+def get_stored_response(key, data, minimal=False):
+    """Возвращает сохранённые данные и код ответа или None, если ключ новый
+
+    Сохраняется полный и короткий ответ, и повтор получает тот, что просит
+    сейчас, даже если первый запрос просил другой.
+    """
+    stored = filter_keys(key, data).first()
+    if not stored:
+        return None
+    if stored.response_status is None:
+        if stored.created_at < timezone.now() - timedelta(seconds=RESERVED_KEY_TIMEOUT):
+            stored.delete()
+            return None
+    elif stored.created_at < get_expiry_threshold():
+        stored.delete()
+        return None
+    if stored.request_hash != get_request_hash(data):
+        return KEY_REUSED_RESPONSE, status.HTTP_422_UNPROCESSABLE_ENTITY
+    if stored.response_status is None:
+        return IN_PROGRESS_RESPONSE, status.HTTP_409_CONFLICT
+    return stored.response_data['minimal' if minimal else 'full'], stored.response_status
+
+
+def store_response(key, data, response_data, response_status):
+    """Сохраняет ответ; response_data — словарь с полным (full) и коротким (minimal) ответом"""
+    OrderIdempotencyKey.objects.create(
+        key=key,
+        scope=get_key_scope(data),
+        request_hash=get_request_hash(data),
+        response_data=response_data,
+        response_status=response_status,
+    )
+
+
+def reserve_key(key, data):
+    OrderIdempotencyKey.objects.create(
+        key=key,
+        scope=get_key_scope(data),
+        request_hash=get_request_hash(data),
+    )
+
+
+def save_reserved_response(key, data, response_data, response_status):
+    filter_keys(key, data).update(
+        response_data=response_data,
+        response_status=response_status,
+    )
+
+
+def delete_stored_response(key, data):
+    filter_keys(key, data).delete()
+
+
+def purge_expired_keys():
+    deleted_count, _ = OrderIdempotencyKey.objects.filter(
+        created_at__lt=get_expiry_threshold(),
+    ).delete()
+    return deleted_count
@@ -0,0 +1,205 @@
+"""Журнал приёма заказов.
+
+Проверенный заказ дописывается строкой JSON в файл и сразу подтверждается
+клиенту, а в БД его переносит отдельный процесс flush_order_intake. Так
+задержка оформления заказа не зависит от блокировок БД на запись.
+
+Сколько журнала уже перенесено в БД, хранится в файле рядом с журналом.
+Если процесс упадёт между коммитом и записью смещения, заказы из
+недописанной пачки не задвоятся: у каждого есть intake_id.
+"""
+import json
+import logging
+import os
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderProducts, Product
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_offset_path():
+    return f'{settings.ORDER_INTAKE_LOG_PATH}.offset'
+
+
+@contextmanager
+def locked_log():
+    import fcntl  # есть только в Unix, а журнал нужен только в prod
+
+    with open(settings.ORDER_INTAKE_LOG_PATH, 'a+b') as log_file:
+        fcntl.flock(log_file, fcntl.LOCK_EX)
+        try:
+            yield log_file
+        finally:
+            fcntl.flock(log_file, fcntl.LOCK_UN)
+
+
+def end_partial_line(log_file):
+    """Завершает строку, оборванную падением процесса посреди записи
+
+    Иначе следующий заказ допишется в её конец, и обе строки пропадут как
+    повреждённые. Вызывать только под блокировкой журнала.
+    """
+    end = log_file.seek(0, os.SEEK_END)
+    if not end:
+        return
+    log_file.seek(end - 1)
+    if log_file.read(1) != b'\n':
+        logger.error('Журнал заказов обрывается недописанной строкой, она будет пропущена')
+        log_file.write(b'\n')
+
+
+def repair_log():
+    with locked_log() as log_file:
+        end_partial_line(log_file)
+
+
+def new_intake_id():
+    return str(uuid.uuid4())
+
+
+def append_order(validated_data, intake_id=None):
+    """Дописывает заказ в журнал, возвращает его intake_id"""
+    intake_id = intake_id or new_intake_id()
+    entry = {
+        'intake_id': intake_id,
+        'created_at': timezone.now().isoformat(),
+        'firstname': validated_data['firstname'],
+        'lastname': validated_data['lastname'],
+        'phonenumber': str(validated_data['phonenumber']),
+        'address': validated_data['address'],
+        'products': [
+            {
+                'product': line['product'].id,
+                'quantity': line['quantity'],
+                'price': str(line['product'].price),
+            }
+            for line in validated_data['products']
+        ],
+    }
+    line = json.dumps(entry, ensure_ascii=False).encode() + b'\n'
+
+    with locked_log() as log_file:
+        end_partial_line(log_file)
+        log_file.write(line)
+        log_file.flush()
+        os.fsync(log_file.fileno())
+    return intake_id
+
+
+def read_offset():
+    try:
+        with open(get_offset_path()) as offset_file:
+            return int(offset_file.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_offset(offset):
+    offset_path = get_offset_path()
+    temp_path = f'{offset_path}.tmp'
+    with open(temp_path, 'w') as offset_file:
+        offset_file.write(str(offset))
+        offset_file.flush()
+        os.fsync(offset_file.fileno())
+    os.replace(temp_path, offset_path)
+
+
+def read_entries(offset, limit):
+    """Читает до limit полных строк журнала начиная со смещения"""
+    entries = []
+    try:
+        log_file = open(settings.ORDER_INTAKE_LOG_PATH, 'rb')
+    except FileNotFoundError:
+        return entries, offset
+
+    with log_file:
+        log_file.seek(offset)
+        while len(entries) < limit:
+            line = log_file.readline()
+            if not line.endswith(b'\n'):
+                # Строку ещё дописывают, заберём её в следующий раз
+                break
+            offset += len(line)
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.error('Пропущена повреждённая строка журнала заказов: %r', line)
+    return entries, offset
+
+
+@transaction.atomic
+def save_entries(entries):
+    intake_ids = [entry['intake_id'] for entry in entries]
+    saved_intake_ids = {
+        str(intake_id) for intake_id in
+        Order.objects.filter(intake_id__in=intake_ids).values_list('intake_id', flat=True)
+    }
+    product_ids = {line['product'] for entry in entries for line in entry['products']}
+    existing_product_ids = set(Product.objects.in_bulk(product_ids))
+
+    new_entries = [entry for entry in entries if entry['intake_id'] not in saved_intake_ids]
+    orders = Order.objects.bulk_create([
+        Order(
+            intake_id=entry['intake_id'],
+            firstname=entry['firstname'],
+            lastname=entry['lastname'],
+            phonenumber=entry['phonenumber'],
+            address=entry['address'],
+            created_at=parse_datetime(entry['created_at']),
+        )
+        for entry in new_entries
+    ])
+
+    order_products = []
+    for order, entry in zip(orders, new_entries):
+        for line in entry['products']:
+            if line['product'] not in existing_product_ids:
+                logger.warning(
+                    'Товар %s из заказа %s удалён, позиция пропущена',
+                    line['product'], entry['intake_id'],
+                )
+                continue
+            order_products.append(OrderProducts(
+                order=order,
+                product_id=line['product'],
+                quantity=line['quantity'],
+                price=line['price'],
+            ))
+    OrderProducts.objects.bulk_create(order_products)
+    return len(orders)
+
+
+def flush_intake(batch_size=500):
+    """Переносит накопленные в журнале заказы в БД, возвращает число новых заказов"""
+    saved_count = 0
+    offset = read_offset()
+    while True:
+        entries, next_offset = read_entries(offset, batch_size)
+        if next_offset == offset:
+            break
+        saved_count += save_entries(entries)
+        write_offset(next_offset)
+        offset = next_offset
+
+    truncate_flushed_log(offset)
+    return saved_count
+
+
+def truncate_flushed_log(offset):
+    """Очищает журнал, если всё из него уже в БД"""
+    if not offset:
+        return
+    with locked_log() as log_file:
+        if log_file.seek(0, os.SEEK_END) != offset:
+            return
+        # Сначала смещение: если упадём до очистки, повтор отсеется по intake_id
+        write_offset(0)
+        log_file.truncate(0)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые выполненные заказы в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+            help='Архивировать заказы старше указанного числа дней',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ORDER_ARCHIVE_BATCH_SIZE,
+            help='Сколько заказов переносить в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        archived_count = archive_orders(options['days'], options['batch_size'])
+        self.stdout.write(f'Заказов перенесено в архив: {archived_count}')
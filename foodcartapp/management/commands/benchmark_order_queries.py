@@ -0,0 +1,77 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from foodcartapp.fake_data import create_menu, create_orders
+from foodcartapp.models import Order
+
+
+def get_benchmark_queries(restaurant):
+    """Запросы, под которые подобраны индексы модели Order"""
+    archive_border = timezone.now() - timedelta(days=30)
+    return [
+        (
+            'Доска менеджера: незавершённые заказы',
+            Order.objects.exclude(status='V').order_by('created_at'),
+        ),
+        (
+            'Необработанные заказы по времени создания',
+            Order.objects.filter(status='U').order_by('created_at'),
+        ),
+        (
+            'Заказы ресторана в работе',
+            Order.objects.filter(restaurant=restaurant, status='S'),
+        ),
+        (
+            'Кандидаты на архивацию',
+            Order.objects.filter(status='V', delivered_at__lt=archive_border),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Заполняет временную БД заказами и показывает планы и время запросов к ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument('--restaurants', type=int, default=20)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+    def run_benchmark(self, options):
+        started_at = time.perf_counter()
+        restaurants, products = create_menu(
+            options['restaurants'],
+            options['products'],
+            seed=options['seed'],
+        )
+        create_orders(options['orders'], restaurants, products, seed=options['seed'])
+        self.stdout.write(
+            f'Создано заказов: {options["orders"]} '
+            f'за {time.perf_counter() - started_at:.1f} с\n'
+        )
+
+        for title, queryset in get_benchmark_queries(restaurants[0]):
+            timings = []
+            for _ in range(options['repeat']):
+                started_at = time.perf_counter()
+                rows_count = len(queryset.values_list('pk', flat=True))
+                timings.append(time.perf_counter() - started_at)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(
+                f'строк: {rows_count}, лучшее время: {min(timings) * 1000:.1f} мс\n'
+            )
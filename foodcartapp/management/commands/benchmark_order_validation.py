@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework import serializers
+
+from foodcartapp.fake_data import create_menu
+from foodcartapp.management.commands.benchmark_traffic import QueryCounter
+from foodcartapp.serializers import OrderProductsSerializer, OrderSerializer
+
+
+class PerLineOrderSerializer(OrderSerializer):
+    """Прежняя проверка: каждый товар ищется в БД отдельным запросом"""
+    products = serializers.ListSerializer(child=OrderProductsSerializer(), write_only=True)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время и число запросов при проверке заказов с разным числом позиций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50, 100])
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+    def run_benchmark(self, options):
+        _, products = create_menu(10, max(options['lines']), seed=options['seed'])
+
+        self.stdout.write(
+            f'{"позиций":>8}{"SQL по одному":>15}{"мс по одному":>14}'
+            f'{"SQL пачкой":>12}{"мс пачкой":>11}'
+        )
+        for lines_count in options['lines']:
+            order = {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, улица Ленина, 1',
+                'products': [
+                    {'product': product.id, 'quantity': 1}
+                    for product in products[:lines_count]
+                ],
+            }
+            per_line = self.measure(PerLineOrderSerializer, order, options['repeat'])
+            bulk = self.measure(OrderSerializer, order, options['repeat'])
+            self.stdout.write(
+                f'{lines_count:>8}{per_line[0]:>15}{per_line[1]:>14.2f}'
+                f'{bulk[0]:>12}{bulk[1]:>11.2f}'
+            )
+
+    def measure(self, serializer_class, order, repeat):
+        query_counter = QueryCounter()
+        with connection.execute_wrapper(query_counter):
+            serializer_class(data=order).is_valid(raise_exception=True)
+
+        started_at = time.perf_counter()
+        for _ in range(repeat):
+            serializer_class(data=order).is_valid(raise_exception=True)
+        return query_counter.count, (time.perf_counter() - started_at) / repeat * 1000
@@ -0,0 +1,220 @@
+import io
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from foodcartapp.fake_data import create_menu, create_orders
+from foodcartapp.models import Product, Restaurant
+from metrics.timing import percentile
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_endpoint_name(path):
+    return re.sub(r'/\d+/', '/<id>/', path.partition('?')[0])
+
+
+def generate_traffic(requests_count, order_ratio, seed=None):
+    """Смесь чтений каталога и оформлений заказов, как у публичного сайта"""
+    rnd = random.Random(seed)
+    product_ids = list(Product.objects.available().values_list('id', flat=True))
+    restaurant_ids = list(Restaurant.objects.values_list('id', flat=True))
+
+    traffic = []
+    for _ in range(requests_count):
+        if rnd.random() < order_ratio:
+            traffic.append({
+                'method': 'POST',
+                'path': '/api/order/',
+                # Заказы оформляют разные клиенты, иначе упрёмся в ограничение частоты
+                'remote_addr': f'10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}',
+                'body': {
+                    'firstname': 'Иван',
+                    'lastname': 'Петров',
+                    'phonenumber': f'+7916{rnd.randint(1000000, 9999999)}',
+                    'address': f'Москва, улица Ленина, {rnd.randint(1, 200)}',
+                    'products': [
+                        {'product': product_id, 'quantity': rnd.randint(1, 3)}
+                        for product_id in rnd.sample(product_ids, rnd.randint(1, 5))
+                    ],
+                },
+            })
+            continue
+
+        traffic.append({
+            'method': 'GET',
+            'path': rnd.choice([
+                '/api/products/',
+                '/api/banners/',
+                f'/api/restaurants/{rnd.choice(restaurant_ids)}/menu/',
+            ]),
+        })
+    return traffic
+
+
+def read_traffic(path):
+    """Читает записанный трафик: по JSON-объекту {method, path, body} в строке"""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def call_application(application, method, path, body, remote_addr='127.0.0.1'):
+    """Вызывает WSGI-приложение в текущем процессе и возвращает код ответа"""
+    path_info, _, query_string = path.partition('?')
+    environ = {
+        'REMOTE_ADDR': remote_addr,
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'localhost',
+        'HTTP_HOST': 'localhost',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return int(statuses[0].split()[0])
+
+
+class Command(BaseCommand):
+    help = 'Генерирует или воспроизводит трафик к сайту и считает задержки по эндпоинтам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Запросов в секунду, 0 — без ограничений')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument('--order-ratio', type=float, default=0.2,
+                            help='Доля запросов на оформление заказа')
+        parser.add_argument('--replay', help='Файл с записанным трафиком в формате JSON Lines')
+        parser.add_argument('--url', help='Адрес запущенного сервера, например http://127.0.0.1:8000')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Не создавать временную БД с тестовыми данными')
+        parser.add_argument('--database-file',
+                            help='Создать временную SQLite-БД в файле, а не в памяти, '
+                                 'чтобы воркеры делили блокировки как в prod')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['url'] or options['use_current_db']:
+            self.run_benchmark(options)
+            return
+
+        if options['database_file']:
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict.get('TEST', {}),
+                'NAME': options['database_file'],
+            }
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            restaurants, products = create_menu(10, 40, seed=options['seed'])
+            create_orders(1000, restaurants, products, seed=options['seed'])
+            self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+    def run_benchmark(self, options):
+        if options['replay']:
+            traffic = read_traffic(options['replay'])
+        else:
+            traffic = generate_traffic(options['requests'], options['order_ratio'], options['seed'])
+
+        if options['url']:
+            session = requests.Session()
+            base_url = options['url'].rstrip('/')
+
+            def send(request):
+                response = session.request(
+                    request['method'],
+                    f'{base_url}{request["path"]}',
+                    json=request.get('body'),
+                )
+                return response.status_code, None
+        else:
+            from star_burger.wsgi import application
+
+            def send(request):
+                body = json.dumps(request.get('body', {})).encode()
+                query_counter = QueryCounter()
+                with connection.execute_wrapper(query_counter):
+                    status = call_application(
+                        application, request['method'], request['path'], body,
+                        request.get('remote_addr', '127.0.0.1'),
+                    )
+                return status, query_counter.count
+
+        rate = options['rate']
+        started_at = time.perf_counter()
+
+        def run(number, request):
+            if rate:
+                delay = started_at + number / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            request_started_at = time.perf_counter()
+            status, queries_count = send(request)
+            elapsed = time.perf_counter() - request_started_at
+            return get_endpoint_name(request['path']), status, elapsed, queries_count
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(run, range(len(traffic)), traffic))
+        total_elapsed = time.perf_counter() - started_at
+
+        self.report(results, total_elapsed)
+
+    def report(self, results, total_elapsed):
+        results_by_endpoint = defaultdict(list)
+        for endpoint, status, elapsed, queries_count in results:
+            results_by_endpoint[endpoint].append((status, elapsed, queries_count))
+
+        self.stdout.write(
+            f'{"эндпоинт":<32}{"запросов":>9}{"ошибок":>8}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}{"SQL":>7}'
+        )
+        for endpoint, endpoint_results in sorted(results_by_endpoint.items()):
+            timings = [elapsed * 1000 for _, elapsed, _ in endpoint_results]
+            errors_count = sum(1 for status, _, _ in endpoint_results if status >= 400)
+            queries_counts = [count for _, _, count in endpoint_results if count is not None]
+            queries = (
+                f'{sum(queries_counts) / len(queries_counts):.1f}'
+                if queries_counts else '-'
+            )
+            self.stdout.write(
+                f'{endpoint:<32}{len(endpoint_results):>9}{errors_count:>8}'
+                f'{percentile(timings, 50):>10.1f}{percentile(timings, 95):>10.1f}'
+                f'{percentile(timings, 99):>10.1f}{queries:>7}'
+            )
+
+        self.stdout.write(
+            f'\nВсего запросов: {len(results)} за {total_elapsed:.1f} с, '
+            f'{len(results) / total_elapsed:.1f} запросов/с'
+        )
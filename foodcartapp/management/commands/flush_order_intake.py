@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.intake import flush_intake, repair_log
+
+
+class Command(BaseCommand):
+    help = 'Переносит заказы из журнала приёма в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Сколько заказов сохранять одной транзакцией')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд; 0 — перенести один раз и выйти')
+
+    def handle(self, *args, **options):
+        # Под блокировкой журнала недописанной строкой может быть только след упавшего процесса
+        repair_log()
+        while True:
+            saved_count = flush_intake(options['batch_size'])
+            if saved_count or not options['interval']:
+                self.stdout.write(f'Заказов перенесено в БД: {saved_count}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from foodcartapp.models import Product
+from foodcartapp.thumbnails import make_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок товаров, у которых их ещё нет'
+
+    def handle(self, *args, **options):
+        created_count = 0
+        products = Product.objects.exclude(image='').exclude(thumbnails_image=F('image')).only('image')
+        for product in products:
+            if make_thumbnails(product.image):
+                Product.objects.filter(pk=product.pk).update(thumbnails_image=product.image.name)
+                created_count += 1
+        self.stdout.write(f'Картинок обработано: {created_count}')
@@ -0,0 +1,25 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from foodcartapp.banners import STARTER_BANNERS
+from foodcartapp.models import Banner
+
+
+class Command(BaseCommand):
+    help = 'Переносит стартовые баннеры из assets в БД, чтобы их можно было менять в админке'
+
+    def handle(self, *args, **options):
+        existing_titles = set(Banner.objects.values_list('title', flat=True))
+        created_count = 0
+        for position, (title, filename, text) in enumerate(STARTER_BANNERS):
+            if title in existing_titles:
+                continue
+            banner = Banner(title=title, text=text, position=position)
+            with open(os.path.join(settings.BASE_DIR, 'assets', filename), 'rb') as image_file:
+                banner.image.save(filename, File(image_file), save=False)
+            banner.save()
+            created_count += 1
+        self.stdout.write(f'Баннеров загружено: {created_count}')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Product, Restaurant
+from foodcartapp.search import index_products, index_restaurants
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс товаров и ресторанов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        products = Product.objects.select_related('category').order_by('id')
+        for start in range(0, products.count(), batch_size):
+            index_products(products[start:start + batch_size])
+        restaurants = Restaurant.objects.order_by('id')
+        for start in range(0, restaurants.count(), batch_size):
+            index_restaurants(restaurants[start:start + batch_size])
+        self.stdout.write(
+            f'Проиндексировано товаров: {products.count()}, ресторанов: {restaurants.count()}'
+        )
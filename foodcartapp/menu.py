@@ -0,0 +1,88 @@
+from django.core.cache import cache
+
+from geoinfostore.models import Address
+from metrics.registry import registry
+
+from .models import Restaurant, RestaurantMenuItem
+
+
+RESTAURANT_MENU_CACHE_KEY = 'restaurant_menu:{restaurant_id}'
+RESTAURANT_MENU_CACHE_TIMEOUT = 60 * 60
+
+
+def get_restaurant_menu_cache_key(restaurant_id):
+    return RESTAURANT_MENU_CACHE_KEY.format(restaurant_id=restaurant_id)
+
+
+def dump_menu_item(menu_item):
+    product = menu_item.product
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': menu_item.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'thumbnails': product.get_thumbnail_urls(),
+    }
+
+
+def get_restaurant_menu(restaurant_id):
+    """Возвращает меню ресторана с его ценами, собранное один раз и закэшированное"""
+    cache_key = get_restaurant_menu_cache_key(restaurant_id)
+    menu = cache.get(cache_key)
+    if menu is not None:
+        registry.inc('starburger_menu_cache_total', {'result': 'hit'})
+        return menu
+    registry.inc('starburger_menu_cache_total', {'result': 'miss'})
+
+    menu_items = (
+        RestaurantMenuItem.objects
+        .filter(restaurant_id=restaurant_id, availability=True)
+        .select_related('product__category')
+        .order_by('product__name')
+    )
+    menu = [dump_menu_item(menu_item) for menu_item in menu_items]
+    cache.set(cache_key, menu, RESTAURANT_MENU_CACHE_TIMEOUT)
+    return menu
+
+
+def invalidate_restaurant_menus(restaurant_ids):
+    """Сбрасывает закэшированные меню ресторанов"""
+    cache.delete_many([
+        get_restaurant_menu_cache_key(restaurant_id)
+        for restaurant_id in set(restaurant_ids)
+    ])
+
+
+def find_nearest_restaurant(latitude, longitude):
+    """Ищет ближайший ресторан среди тех, чьи координаты уже есть в БД"""
+    from geopy import distance  # нужен редко, поэтому не грузим его при запуске воркера
+
+    restaurants = [
+        restaurant for restaurant in Restaurant.objects.all()
+        if restaurant.address
+    ]
+    addresses = Address.objects.with_coordinates().filter(
+        raw_address__in=[restaurant.address for restaurant in restaurants],
+    )
+    coords_by_address = {address.raw_address: address.coordinates for address in addresses}
+
+    nearest_restaurant, nearest_distance = None, None
+    for restaurant in restaurants:
+        restaurant_coords = coords_by_address.get(restaurant.address)
+        if not restaurant_coords:
+            continue
+
+        restaurant_distance = distance.distance(
+            (latitude, longitude),
+            restaurant_coords
+        ).km
+        if nearest_distance is None or restaurant_distance < nearest_distance:
+            nearest_restaurant, nearest_distance = restaurant, restaurant_distance
+
+    return nearest_restaurant, nearest_distance
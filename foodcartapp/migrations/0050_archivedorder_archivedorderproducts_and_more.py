@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:26
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_order_restaurant_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='payment_method',
+            field=models.CharField(choices=[('C', 'Наличными'), ('E', 'Электронный'), ('K', 'Картой')], db_index=True, default='C', max_length=1, verbose_name='Способ оплаты'),
+        ),
+        migrations.AlterField(
+            model_name='orderproducts',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0)], verbose_name='цена'),
+        ),
+        migrations.AlterField(
+            model_name='restaurantmenuitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, validators=[django.core.validators.MinValueValidator(0)], verbose_name='цена'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('firstname', models.CharField(max_length=50, verbose_name='Имя')),
+                ('lastname', models.CharField(max_length=50, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(db_index=True, max_length=128, region='RU', verbose_name='Номер телефона')),
+                ('address', models.CharField(max_length=100, verbose_name='Адрес доставки')),
+                ('status', models.CharField(choices=[('U', 'Необработанный'), ('S', 'Готовится'), ('D', 'В пути'), ('V', 'Выполнен')], max_length=1, verbose_name='Статус заказа')),
+                ('comment_from_manager', models.TextField(blank=True, max_length=200, verbose_name='Комментарий менеджера')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='Дата и время создания')),
+                ('called_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата и время звонка')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата и время доставки')),
+                ('payment_method', models.CharField(choices=[('C', 'Наличными'), ('E', 'Электронный'), ('K', 'Картой')], max_length=1, verbose_name='Способ оплаты')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата и время архивации')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Ресторан для заказа')),
+            ],
+            options={
+                'verbose_name': 'архивный заказ',
+                'verbose_name_plural': 'архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderProducts',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orderproducts', to='foodcartapp.archivedorder')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='foodcartapp.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_order_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='intake_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='ID в журнале приёма заказов'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0054_banner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='слово')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='foodcartapp.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'слово поискового индекса товаров',
+                'verbose_name_plural': 'слова поискового индекса товаров',
+                'indexes': [models.Index(fields=['token', 'product'], name='product_search_token_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='слово')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'слово поискового индекса ресторанов',
+                'verbose_name_plural': 'слова поискового индекса ресторанов',
+                'indexes': [models.Index(fields=['token', 'restaurant'], name='restaurant_search_token_idx')],
+            },
+        ),
+    ]
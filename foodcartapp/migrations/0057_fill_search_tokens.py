@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:08
+
+import re
+
+from django.db import migrations
+
+
+WORD_RE = re.compile(r'\w+')
+TOKEN_MAX_LENGTH = 50
+
+
+def normalize_words(*texts):
+    """Копия foodcartapp.search.normalize_words на момент миграции"""
+    words = set()
+    for text in texts:
+        for word in WORD_RE.findall((text or '').casefold().replace('ё', 'е')):
+            words.add(word[:TOKEN_MAX_LENGTH])
+    return words
+
+
+def fill_search_tokens(apps, schema_editor):
+    """Строит поисковый индекс для уже заведённых товаров и ресторанов"""
+    Product = apps.get_model('foodcartapp', 'Product')
+    Restaurant = apps.get_model('foodcartapp', 'Restaurant')
+    ProductSearchToken = apps.get_model('foodcartapp', 'ProductSearchToken')
+    RestaurantSearchToken = apps.get_model('foodcartapp', 'RestaurantSearchToken')
+    db_alias = schema_editor.connection.alias
+
+    ProductSearchToken.objects.using(db_alias).bulk_create([
+        ProductSearchToken(product=product, token=word)
+        for product in Product.objects.using(db_alias).select_related('category').iterator()
+        for word in normalize_words(
+            product.name,
+            product.category.name if product.category else '',
+        )
+    ], batch_size=1000)
+    RestaurantSearchToken.objects.using(db_alias).bulk_create([
+        RestaurantSearchToken(restaurant=restaurant, token=word)
+        for restaurant in Restaurant.objects.using(db_alias).iterator()
+        for word in normalize_words(restaurant.name, restaurant.address, restaurant.contact_phone)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0056_search_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_tokens, migrations.RunPython.noop),
+    ]
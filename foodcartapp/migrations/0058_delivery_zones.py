@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_fill_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='delivery_radius',
+            field=models.FloatField(blank=True, help_text='Если не указан, ресторан доставляет по любому адресу', null=True, validators=[django.core.validators.MinValueValidator(0.1)], verbose_name='радиус доставки, км'),
+        ),
+        migrations.CreateModel(
+            name='DeliveryZoneCell',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geohash', models.CharField(max_length=12, verbose_name='ячейка geohash')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_zone_cells', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'ячейка зоны доставки',
+                'verbose_name_plural': 'ячейки зон доставки',
+                'indexes': [models.Index(fields=['geohash', 'restaurant'], name='delivery_zone_cell_idx')],
+            },
+        ),
+    ]
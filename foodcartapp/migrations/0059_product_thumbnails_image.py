@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_delivery_zones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumbnails_image',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='картинка, для которой готовы уменьшенные копии'),
+        ),
+    ]
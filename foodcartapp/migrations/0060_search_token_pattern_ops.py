@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_product_thumbnails_image'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productsearchtoken',
+            name='product_search_token_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='restaurantsearchtoken',
+            name='restaurant_search_token_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productsearchtoken',
+            index=models.Index(fields=['token', 'product'], name='product_search_token_idx', opclasses=['varchar_pattern_ops', 'int4_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantsearchtoken',
+            index=models.Index(fields=['token', 'restaurant'], name='restaurant_search_token_idx', opclasses=['varchar_pattern_ops', 'int4_ops']),
+        ),
+    ]
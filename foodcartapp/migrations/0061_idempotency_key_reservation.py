@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_search_token_pattern_ops'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderidempotencykey',
+            name='response_data',
+            field=models.JSONField(null=True, verbose_name='ответ'),
+        ),
+        migrations.AlterField(
+            model_name='orderidempotencykey',
+            name='response_status',
+            field=models.PositiveSmallIntegerField(help_text='Пусто, пока заказ с этим ключом ещё записывается', null=True, verbose_name='код ответа'),
+        ),
+    ]
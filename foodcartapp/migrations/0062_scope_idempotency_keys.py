@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+def delete_unscoped_keys(apps, schema_editor):
+    """Старые ключи без телефона и хэша запроса нельзя безопасно отдать повтору, а живут они сутки"""
+    OrderIdempotencyKey = apps.get_model('foodcartapp', 'OrderIdempotencyKey')
+    OrderIdempotencyKey.objects.using(schema_editor.connection.alias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_idempotency_key_reservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_unscoped_keys, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='orderidempotencykey',
+            name='request_hash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='хэш запроса'),
+        ),
+        migrations.AddField(
+            model_name='orderidempotencykey',
+            name='scope',
+            field=models.CharField(blank=True, help_text='Только цифры номера: ключи разных клиентов не пересекаются', max_length=20, verbose_name='телефон клиента'),
+        ),
+        migrations.AlterField(
+            model_name='orderidempotencykey',
+            name='key',
+            field=models.CharField(max_length=255, verbose_name='ключ идемпотентности'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderidempotencykey',
+            constraint=models.UniqueConstraint(fields=('scope', 'key'), name='order_idempotency_key_unique'),
+        ),
+    ]
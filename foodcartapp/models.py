@@ -1,9 +1,11 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models import F, Sum
+from django.db.models import F, Q, Sum
 from django.utils import timezone
 
+from .thumbnails import get_thumbnail_urls
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -20,6 +22,13 @@ class Restaurant(models.Model):
         max_length=50,
         blank=True,
     )
+    delivery_radius = models.FloatField(
+        'радиус доставки, км',
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.1)],
+        help_text='Если не указан, ресторан доставляет по любому адресу',
+    )
 
     class Meta:
         verbose_name = 'ресторан'
@@ -29,6 +38,29 @@ class Restaurant(models.Model):
         return self.name
 
 
+class DeliveryZoneCell(models.Model):
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='delivery_zone_cells',
+        verbose_name='ресторан',
+    )
+    geohash = models.CharField(
+        'ячейка geohash',
+        max_length=12,
+    )
+
+    class Meta:
+        verbose_name = 'ячейка зоны доставки'
+        verbose_name_plural = 'ячейки зон доставки'
+        indexes = [
+            models.Index(fields=['geohash', 'restaurant'], name='delivery_zone_cell_idx'),
+        ]
+
+    def __str__(self):
+        return self.geohash
+
+
 class ProductQuerySet(models.QuerySet):
     def available(self):
         products = (
@@ -75,6 +107,12 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    thumbnails_image = models.CharField(
+        'картинка, для которой готовы уменьшенные копии',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -95,6 +133,23 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def has_thumbnails(self):
+        return bool(self.image) and self.thumbnails_image == self.image.name
+
+    def get_thumbnail_urls(self):
+        """Адреса уменьшенных копий картинки или None, если их ещё не сделали"""
+        if not self.has_thumbnails:
+            return None
+        return get_thumbnail_urls(self.image)
+
+    def get_thumbnail_url(self, size='small', extension='webp'):
+        """Адрес уменьшенной копии картинки, а если её нет — самой картинки"""
+        thumbnail_urls = self.get_thumbnail_urls()
+        if not thumbnail_urls:
+            return self.image.url
+        return thumbnail_urls[size][extension]
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -170,7 +225,6 @@ class Order(models.Model):
         max_length=1,
         choices=ORDER_STATUS,
         default='U',
-        db_index=True
     )
 
     comment_from_manager = models.TextField(
@@ -188,13 +242,11 @@ class Order(models.Model):
         'Дата и время звонка',
         null=True,
         blank=True,
-        db_index=True
     )
     delivered_at = models.DateTimeField(
         'Дата и время доставки',
         null=True,
         blank=True,
-        db_index=True
     )
 
     PAYMENT_METHODS = [
@@ -208,7 +260,6 @@ class Order(models.Model):
         max_length=1,
         choices=PAYMENT_METHODS,
         default='C',
-        db_index=True
     )
 
     restaurant = models.ForeignKey(
@@ -217,7 +268,16 @@ class Order(models.Model):
         related_name='orders',
         on_delete=models.PROTECT,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False,  # покрыт составным индексом (restaurant, status)
+    )
+
+    intake_id = models.UUIDField(
+        'ID в журнале приёма заказов',
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
     )
 
     def get_status_display(self):
@@ -230,6 +290,19 @@ class Order(models.Model):
     
     class Meta:
         verbose_name = "Заказ"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['restaurant', 'status']),
+            models.Index(fields=['status', 'delivered_at']),
+            # Доска менеджера читает только незавершённые заказы
+            models.Index(
+                fields=['created_at'],
+                condition=~Q(status='V'),
+                name='order_open_created_at_idx',
+            ),
+            # Поиск заказа по телефону в админке
+            models.Index(fields=['phonenumber'], name='order_phonenumber_idx'),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname} - {self.address}"
@@ -260,3 +333,207 @@ class OrderProducts(models.Model):
 
     def __str__(self):
         return f"{self.order} - {self.product} {self.quantity}"
+
+
+class ArchivedOrder(models.Model):
+    id = models.IntegerField('ID заказа', primary_key=True)
+    firstname = models.CharField('Имя', max_length=50)
+    lastname = models.CharField('Фамилия', max_length=50)
+    phonenumber = PhoneNumberField('Номер телефона', region='RU', db_index=True)
+    address = models.CharField('Адрес доставки', max_length=100)
+    status = models.CharField(
+        'Статус заказа',
+        max_length=1,
+        choices=Order.ORDER_STATUS,
+    )
+    comment_from_manager = models.TextField(
+        'Комментарий менеджера',
+        max_length=200,
+        blank=True
+    )
+    created_at = models.DateTimeField('Дата и время создания', db_index=True)
+    called_at = models.DateTimeField('Дата и время звонка', null=True, blank=True)
+    delivered_at = models.DateTimeField('Дата и время доставки', null=True, blank=True)
+    payment_method = models.CharField(
+        'Способ оплаты',
+        max_length=1,
+        choices=Order.PAYMENT_METHODS,
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Ресторан для заказа',
+        related_name='archived_orders',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    archived_at = models.DateTimeField(
+        'Дата и время архивации',
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'архивный заказ'
+        verbose_name_plural = 'архивные заказы'
+
+    def __str__(self):
+        return f"{self.firstname} {self.lastname} - {self.address}"
+
+
+class ArchivedOrderProducts(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='orderproducts'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    quantity = models.IntegerField()
+    price = models.DecimalField(
+        'цена',
+        max_digits=8,
+        decimal_places=2,
+    )
+
+    def __str__(self):
+        return f"{self.order_id} - {self.product_id} {self.quantity}"
+
+
+class OrderIdempotencyKey(models.Model):
+    key = models.CharField(
+        'ключ идемпотентности',
+        max_length=255,
+    )
+    scope = models.CharField(
+        'телефон клиента',
+        max_length=20,
+        blank=True,
+        help_text='Только цифры номера: ключи разных клиентов не пересекаются',
+    )
+    request_hash = models.CharField(
+        'хэш запроса',
+        max_length=64,
+        blank=True,
+    )
+    response_status = models.PositiveSmallIntegerField(
+        'код ответа',
+        null=True,
+        help_text='Пусто, пока заказ с этим ключом ещё записывается',
+    )
+    response_data = models.JSONField('ответ', null=True)
+    created_at = models.DateTimeField(
+        'создан',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности заказа'
+        verbose_name_plural = 'ключи идемпотентности заказов'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='order_idempotency_key_unique'),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50,
+    )
+    image = models.ImageField(
+        'картинка',
+        upload_to='banners',
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    position = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+    )
+    active_from = models.DateTimeField(
+        'показывать с',
+        null=True,
+        blank=True,
+    )
+    active_until = models.DateTimeField(
+        'показывать до',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ['position', 'id']
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+
+    def is_active(self, now):
+        return (
+            (not self.active_from or self.active_from <= now)
+            and (not self.active_until or self.active_until > now)
+        )
+
+    def __str__(self):
+        return self.title
+
+
+class SearchToken(models.Model):
+    token = models.CharField(
+        'слово',
+        max_length=50,
+    )
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.token
+
+
+class ProductSearchToken(SearchToken):
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='товар',
+    )
+
+    class Meta:
+        verbose_name = 'слово поискового индекса товаров'
+        verbose_name_plural = 'слова поискового индекса товаров'
+        indexes = [
+            models.Index(
+                fields=['token', 'product'],
+                name='product_search_token_idx',
+                # Для LIKE 'слово%' в PostgreSQL, другие СУБД классы операторов не учитывают
+                opclasses=['varchar_pattern_ops', 'int4_ops'],
+            ),
+        ]
+
+
+class RestaurantSearchToken(SearchToken):
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='ресторан',
+    )
+
+    class Meta:
+        verbose_name = 'слово поискового индекса ресторанов'
+        verbose_name_plural = 'слова поискового индекса ресторанов'
+        indexes = [
+            models.Index(
+                fields=['token', 'restaurant'],
+                name='restaurant_search_token_idx',
+                opclasses=['varchar_pattern_ops', 'int4_ops'],
+            ),
+        ]
@@ -0,0 +1,95 @@
+"""Поисковый индекс товаров и ресторанов.
+
+SQLite не умеет приводить кириллицу к нижнему регистру, а поиск по
+LIKE '%...%' перебирает всю таблицу. Поэтому названия заранее разбиваются
+на слова, приводятся к нижнему регистру средствами Python и хранятся по
+слову в строке с индексом. Поиск по началу слова — это LIKE 'слово%':
+в PostgreSQL его ищет индекс с varchar_pattern_ops, а в SQLite, который
+для LIKE индекс не берёт, к нему добавляется диапазон [слово, слово + U+10FFFF).
+При бинарном сравнении строк SQLite этот диапазон точен.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Product, ProductSearchToken, Restaurant, RestaurantSearchToken
+
+
+WORD_RE = re.compile(r'\w+')
+TOKEN_MAX_LENGTH = ProductSearchToken._meta.get_field('token').max_length
+# Больше любого символа: при бинарном сравнении слова с началом word лежат в [word, word + TOKEN_UPPER_BOUND)
+TOKEN_UPPER_BOUND = '\U0010ffff'
+MAX_QUERY_WORDS = 5
+PRODUCT_SEARCH_LIMIT = 20
+
+
+def normalize_words(*texts):
+    """Слова из текстов в нижнем регистре, ё заменена на е"""
+    words = set()
+    for text in texts:
+        for word in WORD_RE.findall((text or '').casefold().replace('ё', 'е')):
+            words.add(word[:TOKEN_MAX_LENGTH])
+    return words
+
+
+def get_product_words(product):
+    return normalize_words(
+        product.name,
+        product.category.name if product.category else '',
+    )
+
+
+def get_restaurant_words(restaurant):
+    return normalize_words(
+        restaurant.name,
+        restaurant.address,
+        restaurant.contact_phone,
+    )
+
+
+def index_products(products):
+    products = list(products)
+    ProductSearchToken.objects.filter(product__in=products).delete()
+    ProductSearchToken.objects.bulk_create([
+        ProductSearchToken(product=product, token=word)
+        for product in products
+        for word in get_product_words(product)
+    ])
+
+
+def index_restaurants(restaurants):
+    restaurants = list(restaurants)
+    RestaurantSearchToken.objects.filter(restaurant__in=restaurants).delete()
+    RestaurantSearchToken.objects.bulk_create([
+        RestaurantSearchToken(restaurant=restaurant, token=word)
+        for restaurant in restaurants
+        for word in get_restaurant_words(restaurant)
+    ])
+
+
+def filter_by_words(queryset, token_model, field_name, query):
+    """Оставляет объекты, у которых каждое слово запроса — начало одного из их слов"""
+    words = sorted(normalize_words(query))[:MAX_QUERY_WORDS]
+    if not words:
+        return queryset.none()
+    with_range = connections[queryset.db].vendor == 'sqlite'
+    for word in words:
+        token_filter = Q(token__startswith=word)
+        if with_range:
+            token_filter &= Q(token__gte=word, token__lt=word + TOKEN_UPPER_BOUND)
+        matching_ids = token_model.objects.using(queryset.db).filter(token_filter).values(field_name)
+        queryset = queryset.filter(pk__in=matching_ids)
+    return queryset
+
+
+def search_products(query, queryset=None):
+    if queryset is None:
+        queryset = Product.objects.all()
+    return filter_by_words(queryset, ProductSearchToken, 'product', query)
+
+
+def search_restaurants(query, queryset=None):
+    if queryset is None:
+        queryset = Restaurant.objects.all()
+    return filter_by_words(queryset, RestaurantSearchToken, 'restaurant', query)
@@ -1,11 +1,50 @@
 from rest_framework import serializers
-from .models import Order, OrderProducts
+from .models import ArchivedOrder, ArchivedOrderProducts, Order, OrderProducts, Product
+
+
+def get_product_pk(data):
+    """Приводит ключ товара к int так же, как его привёл бы запрос к БД"""
+    if isinstance(data, bool):
+        raise TypeError
+    return Product._meta.pk.get_prep_value(data)
+
+
+class PrefetchedProductField(serializers.PrimaryKeyRelatedField):
+    """Берёт товары из словаря, загруженного списком позиций одним запросом"""
+    products = None
+
+    def to_internal_value(self, data):
+        if self.products is None:
+            return super().to_internal_value(data)
+        try:
+            product = self.products.get(get_product_pk(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+
+class OrderProductsListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            product_pks = set()
+            for line in data:
+                try:
+                    product_pks.add(get_product_pk(line['product']))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            self.child.fields['product'].products = Product.objects.in_bulk(product_pks)
+        return super().to_internal_value(data)
 
 
 class OrderProductsSerializer(serializers.ModelSerializer):
+    product = PrefetchedProductField(queryset=Product.objects.all())
+
     class Meta:
         model = OrderProducts
         fields = ['product', 'quantity']
+        list_serializer_class = OrderProductsListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -20,8 +59,27 @@ class OrderSerializer(serializers.ModelSerializer):
         order = Order.objects.create(**validated_data)
 
         order_products = [
-            OrderProducts(order=order, **product) for product in products
+            OrderProducts(order=order, price=product['product'].price, **product)
+            for product in products
         ]
         OrderProducts.objects.bulk_create(order_products)
 
         return order
+
+
+class ArchivedOrderProductsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderProducts
+        fields = ['product', 'quantity', 'price']
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    products = ArchivedOrderProductsSerializer(source='orderproducts', many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'firstname', 'lastname', 'phonenumber', 'address', 'status',
+            'payment_method', 'restaurant', 'created_at', 'called_at',
+            'delivered_at', 'archived_at', 'products',
+        ]
@@ -0,0 +1,98 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from geoinfostore.models import Address
+
+from .banners import invalidate_banners
+from .delivery_zones import update_delivery_zones
+from .menu import invalidate_restaurant_menus
+from .models import Banner, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .search import index_products, index_restaurants
+from .thumbnails import make_thumbnails
+
+
+@receiver([post_save, post_delete], sender=RestaurantMenuItem)
+def invalidate_menu_on_menu_item_change(sender, instance, **kwargs):
+    invalidate_restaurant_menus([instance.restaurant_id])
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_menu_on_restaurant_change(sender, instance, **kwargs):
+    invalidate_restaurant_menus([instance.id])
+
+
+# Копии делаются раньше сброса кэша меню, чтобы меню собралось уже с ними
+@receiver(post_save, sender=Product)
+def make_thumbnails_on_product_change(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or instance.has_thumbnails:
+        return
+    if make_thumbnails(instance.image):
+        instance.thumbnails_image = instance.image.name
+        Product.objects.filter(pk=instance.pk).update(thumbnails_image=instance.thumbnails_image)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_menu_on_product_change(sender, instance, **kwargs):
+    restaurant_ids = (
+        RestaurantMenuItem.objects
+        .filter(product=instance)
+        .values_list('restaurant_id', flat=True)
+    )
+    invalidate_restaurant_menus(restaurant_ids)
+
+
+@receiver([post_save, pre_delete], sender=ProductCategory)
+def invalidate_menu_on_category_change(sender, instance, **kwargs):
+    restaurant_ids = (
+        RestaurantMenuItem.objects
+        .filter(product__category=instance)
+        .values_list('restaurant_id', flat=True)
+    )
+    invalidate_restaurant_menus(restaurant_ids)
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products([instance])
+
+
+@receiver(post_save, sender=Restaurant)
+def index_restaurant_on_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_restaurants([instance])
+
+
+@receiver(post_save, sender=Restaurant)
+def update_delivery_zone_on_restaurant_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_delivery_zones([instance])
+
+
+@receiver(post_save, sender=Address)
+def update_delivery_zones_on_address_change(sender, instance, raw=False, **kwargs):
+    if not raw and instance.coordinates is not None:
+        update_delivery_zones(
+            Restaurant.objects.filter(address=instance.raw_address, delivery_radius__isnull=False)
+        )
+
+
+@receiver(post_save, sender=ProductCategory)
+def index_products_on_category_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products(instance.products.select_related('category'))
+
+
+@receiver(pre_delete, sender=ProductCategory)
+def index_products_on_category_delete(sender, instance, **kwargs):
+    # Категория у товаров обнуляется без сигналов, поэтому переиндексируем после удаления
+    product_ids = list(instance.products.values_list('id', flat=True))
+    transaction.on_commit(lambda: index_products(
+        Product.objects.filter(pk__in=product_ids).select_related('category')
+    ))
+
+
+@receiver([post_save, post_delete], sender=Banner)
+def invalidate_banners_on_change(sender, instance, **kwargs):
+    invalidate_banners()
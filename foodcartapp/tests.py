@@ -0,0 +1,691 @@
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from geoinfostore.models import Address
+
+from .archive import archive_orders_batch, get_archivable_orders
+from .delivery_zones import encode_geohash, get_restaurant_ids_by_cell, get_zone_cells, haversine_distance
+from .fake_data import create_menu, create_orders
+from .intake import flush_intake, read_entries, save_entries
+from .search import search_products, search_restaurants
+from .models import (
+    ArchivedOrder,
+    Banner,
+    Order,
+    OrderIdempotencyKey,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .throttling import db_latency, get_order_wait, reset_buckets
+from .thumbnails import get_thumbnail_name
+
+
+class PerformanceTestCase(TestCase):
+    """Заполняет БД объёмом данных, похожим на рабочий, и проверяет бюджеты запросов"""
+    restaurants_count = 10
+    products_count = 40
+    orders_count = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants, cls.products = create_menu(
+            cls.restaurants_count,
+            cls.products_count,
+            seed=1,
+        )
+        create_orders(cls.orders_count, cls.restaurants, cls.products, seed=1)
+
+    def setUp(self):
+        cache.clear()
+        db_latency.reset()
+        reset_buckets()
+
+    @contextmanager
+    def assertBudget(self, max_queries):
+        # Время не проверяем: на загруженном CI оно плавает, а число запросов — нет
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+
+        executed = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertLessEqual(
+            len(queries),
+            max_queries,
+            f'Выполнено {len(queries)} запросов вместо {max_queries}:\n{executed}',
+        )
+
+
+class ProductListApiTest(PerformanceTestCase):
+    def test_queries_do_not_depend_on_catalogue_size(self):
+        with self.assertBudget(max_queries=2):
+            response = self.client.get('/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.products_count)
+
+    def test_single_restaurant_is_kept_for_old_clients(self):
+        for product in self.client.get('/api/products/').json():
+            self.assertEqual(product['restaurant'], {
+                'id': product['restaurants'][0]['id'],
+                'name': product['restaurants'][0]['name'],
+            })
+
+    def test_restaurant_menu_is_cached(self):
+        restaurant = self.restaurants[0]
+        self.client.get(f'/api/restaurants/{restaurant.id}/menu/')
+
+        with self.assertBudget(max_queries=1):
+            response = self.client.get(f'/api/restaurants/{restaurant.id}/menu/')
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductSearchTest(PerformanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(name='Ёлочный ЧИЗБУРГЕР', price=300)
+        RestaurantMenuItem.objects.create(restaurant=self.restaurants[0], product=self.product, price=300)
+
+    def test_cyrillic_case_is_folded(self):
+        for query in ['чизбургер', 'Чиз', 'ЕЛОЧ', 'ёлочный чиз']:
+            self.assertEqual(list(search_products(query)), [self.product], query)
+        self.assertFalse(search_products('бургер ёлочный').exists())
+
+    def test_index_follows_changes(self):
+        self.product.name = 'Гамбургер'
+        self.product.save()
+        self.assertFalse(search_products('чизбургер').exists())
+
+        category = ProductCategory.objects.create(name='Новогоднее')
+        self.product.category = category
+        self.product.save()
+        category.name = 'Праздничное меню'
+        category.save()
+        self.assertEqual(list(search_products('праздн')), [self.product])
+
+        restaurant = self.restaurants[0]
+        restaurant.name = 'Звёздный'
+        restaurant.save()
+        self.assertEqual(list(search_restaurants('звезд')), [restaurant])
+
+    def test_search_api(self):
+        with self.assertBudget(max_queries=2):
+            response = self.client.get('/api/products/search/', {'q': 'бургер 1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product['name'] for product in response.json()],
+            ['Бургер 1', 'Бургер 10', 'Бургер 11', 'Бургер 12', 'Бургер 13',
+             'Бургер 14', 'Бургер 15', 'Бургер 16', 'Бургер 17', 'Бургер 18', 'Бургер 19'],
+        )
+        self.assertEqual(self.client.get('/api/products/search/').json(), [])
+
+    def test_like_wildcards_are_literal(self):
+        product = Product.objects.create(name='Бургер_сет', price=300)
+
+        self.assertEqual(list(search_products('бургер_')), [product])
+        self.assertFalse(search_products('бур_ер').exists())
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса зависит от СУБД')
+    def test_search_uses_index(self):
+        plan = search_products('бургер').explain()
+
+        self.assertIn('product_search_token_idx', plan)
+
+
+class DeliveryZoneTest(TestCase):
+    center = (55.755814, 37.617635)
+
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+
+    def test_zone_cells_cover_radius(self):
+        cells = get_zone_cells(*self.center, radius=5)
+
+        for latitude_offset, longitude_offset in [(0, 0), (0.044, 0), (-0.03, 0.05), (0, -0.079)]:
+            point = (self.center[0] + latitude_offset, self.center[1] + longitude_offset)
+            self.assertLessEqual(haversine_distance(self.center, point), 5)
+            self.assertIn(encode_geohash(*point), cells)
+        self.assertNotIn(encode_geohash(self.center[0] + 0.2, self.center[1]), cells)
+
+    def test_zone_follows_restaurant_and_address(self):
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Москва, Красная площадь', delivery_radius=3)
+        near_cell = encode_geohash(self.center[0] + 0.01, self.center[1])
+        self.assertFalse(restaurant.delivery_zone_cells.exists())
+
+        Address.objects.create(raw_address=restaurant.address, latitude=self.center[0], longitude=self.center[1])
+        self.assertEqual(get_restaurant_ids_by_cell([near_cell])[near_cell], {restaurant.id})
+
+        restaurant.delivery_radius = None
+        restaurant.save()
+        self.assertFalse(restaurant.delivery_zone_cells.exists())
+
+    def test_zone_on_zero_meridian(self):
+        restaurant = Restaurant.objects.create(name='Star Burger', address='Гринвич', delivery_radius=3)
+
+        Address.objects.create(raw_address=restaurant.address, latitude=51.4779, longitude=0.0)
+
+        self.assertTrue(restaurant.delivery_zone_cells.exists())
+
+
+class BannersApiTest(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Banner.objects.bulk_create([
+            Banner(title='Burger', image='banners/burger.jpg', position=0),
+            Banner(title='Spices', image='banners/food.jpg', position=1),
+        ])
+
+    def test_banners_are_cached(self):
+        self.client.get('/api/banners/')
+
+        with self.assertBudget(max_queries=0):
+            response = self.client.get('/api/banners/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), Banner.objects.count())
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/banners/')['ETag']
+
+        response = self.client.get('/api/banners/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cache_is_invalidated_on_save(self):
+        etag = self.client.get('/api/banners/')['ETag']
+        banner = Banner.objects.first()
+        banner.title = 'Новый заголовок'
+        banner.save()
+
+        response = self.client.get('/api/banners/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый заголовок', [banner['title'] for banner in response.json()])
+
+    def test_inactive_banners_are_hidden(self):
+        Banner.objects.update(active_until=timezone.now() - timedelta(minutes=1))
+
+        response = self.client.get('/api/banners/')
+
+        self.assertEqual(response.json(), [])
+
+    def test_starter_banners_are_shown_until_banners_are_added(self):
+        Banner.objects.all().delete()
+
+        response = self.client.get('/api/banners/')
+
+        self.assertEqual(
+            [banner['title'] for banner in response.json()],
+            ['Burger', 'Spices', 'New York'],
+        )
+        self.assertTrue(response.json()[0]['src'].endswith('.jpg'))
+
+    def test_load_banners(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        Banner.objects.all().delete()
+
+        with override_settings(MEDIA_ROOT=temp_dir.name):
+            call_command('load_banners', stdout=io.StringIO())
+            call_command('load_banners', stdout=io.StringIO())
+
+            self.assertEqual(Banner.objects.count(), 3)
+            for banner in Banner.objects.all():
+                self.assertTrue(default_storage.exists(banner.image.name))
+
+
+class ThumbnailsTest(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=temp_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def make_image(self):
+        content = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'orange').save(content, 'JPEG')
+        return ContentFile(content.getvalue())
+
+    def test_thumbnails_are_made_on_upload(self):
+        product = Product(name='Бургер', price=100)
+        product.image.save('burger.jpg', self.make_image())
+
+        for extension in ['webp', 'jpeg']:
+            with default_storage.open(get_thumbnail_name(product.image.name, 'small', extension)) as file:
+                self.assertEqual(Image.open(file).size, (100, 67))
+
+        restaurant = Restaurant.objects.create(name='Star Burger')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product, price=100)
+        response = self.client.get('/api/products/')
+        thumbnails = response.json()[0]['thumbnails']
+        self.assertEqual(thumbnails['small']['webp'], product.get_thumbnail_url())
+
+    def test_catalogue_does_not_make_thumbnails(self):
+        image_name = default_storage.save('burger.jpg', self.make_image())
+        product = Product.objects.bulk_create([Product(name='Бургер', price=100, image=image_name)])[0]
+        restaurant = Restaurant.objects.create(name='Star Burger')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product, price=100)
+
+        with patch.object(default_storage, 'exists', side_effect=AssertionError):
+            response = self.client.get('/api/products/')
+
+        self.assertIsNone(response.json()[0]['thumbnails'])
+        self.assertFalse(default_storage.exists(get_thumbnail_name(image_name, 'small', 'webp')))
+
+        call_command('generate_thumbnails', stdout=io.StringIO())
+
+        product.refresh_from_db()
+        self.assertTrue(product.has_thumbnails)
+        self.assertTrue(default_storage.exists(get_thumbnail_name(image_name, 'small', 'webp')))
+
+    def test_missing_image_falls_back_to_original(self):
+        product = Product(name='Бургер', price=100, image='missing.jpg')
+
+        self.assertEqual(product.get_thumbnail_url(), product.image.url)
+
+
+class RegisterOrderTest(PerformanceTestCase):
+    def make_order(self, lines_count):
+        return {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79161234567',
+            'address': 'Москва, улица Ленина, 1',
+            'products': [
+                {'product': product.id, 'quantity': 1}
+                for product in self.products[:lines_count]
+            ],
+        }
+
+    def test_register_order(self):
+        with self.assertBudget(max_queries=5):
+            response = self.client.post(
+                '/api/order/',
+                self.make_order(15),
+                content_type='application/json',
+            )
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()['id'])
+        self.assertEqual(order.orderproducts.count(), 15)
+        self.assertEqual(response.json(), {
+            'id': order.id,
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79161234567',
+            'address': 'Москва, улица Ленина, 1',
+        })
+
+    @override_settings(METRICS_DB_PATH='/nonexistent/metrics.sqlite3')
+    def test_unavailable_metrics_do_not_fail_order(self):
+        response = self.client.post('/api/order/', self.make_order(1), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_minimal_response(self):
+        response = self.client.post(
+            '/api/order/',
+            self.make_order(1),
+            content_type='application/json',
+            headers={'Prefer': 'return=minimal'},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.latest('id')
+        self.assertEqual(response.json(), {'id': order.id, 'status': 'U'})
+
+    def test_retry_with_idempotency_key(self):
+        def register_order():
+            return self.client.post(
+                '/api/order/',
+                self.make_order(15),
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+
+        response = register_order()
+        with self.assertBudget(max_queries=1):
+            retry_response = register_order()
+
+        self.assertEqual(retry_response.status_code, 201)
+        self.assertEqual(retry_response.json(), response.json())
+        self.assertEqual(Order.objects.filter(pk=response.json()['id']).count(), 1)
+        self.assertEqual(Order.objects.count(), self.orders_count + 1)
+
+    def test_expired_idempotency_key_is_reused(self):
+        OrderIdempotencyKey.objects.create(
+            key='retry-1',
+            scope='79161234567',
+            response_data={'full': {'id': 0}, 'minimal': {'id': 0, 'status': 'U'}},
+            response_status=201,
+            created_at=timezone.now() - timedelta(days=2),
+        )
+
+        response = self.client.post(
+            '/api/order/',
+            self.make_order(1),
+            content_type='application/json',
+            headers={'Idempotency-Key': 'retry-1'},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.json()['id'], 0)
+
+    def test_key_reused_for_other_order(self):
+        def register_order(order):
+            return self.client.post(
+                '/api/order/',
+                order,
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+
+        register_order(self.make_order(1))
+        other_order = {**self.make_order(2), 'firstname': 'Пётр'}
+        response = register_order(other_order)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertNotIn('Иван', response.content.decode())
+
+        other_client_order = {**other_order, 'phonenumber': '+79167654321'}
+        response = register_order(other_client_order)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['firstname'], 'Пётр')
+
+    def test_retry_gets_requested_response_shape(self):
+        response = self.client.post(
+            '/api/order/',
+            self.make_order(1),
+            content_type='application/json',
+            headers={'Idempotency-Key': 'retry-1'},
+        )
+        retry_response = self.client.post(
+            '/api/order/',
+            self.make_order(1),
+            content_type='application/json',
+            headers={'Idempotency-Key': 'retry-1', 'Prefer': 'return=minimal'},
+        )
+
+        self.assertEqual(retry_response.status_code, 201)
+        self.assertEqual(retry_response.json(), {'id': response.json()['id'], 'status': 'U'})
+
+    @override_settings(ORDER_PHONE_BUCKET_SIZE=2, ORDER_PHONE_REFILL_PER_MINUTE=1)
+    def test_orders_from_one_phone_are_limited(self):
+        statuses = [
+            self.client.post('/api/order/', self.make_order(1), content_type='application/json').status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [201, 201, 429])
+        response = self.client.post('/api/order/', self.make_order(1), content_type='application/json')
+        self.assertEqual(int(response['Retry-After']), 60)
+
+    @override_settings(ORDER_IP_BUCKET_SIZE=5, ORDER_IP_REFILL_PER_MINUTE=1)
+    def test_concurrent_requests_do_not_share_tokens(self):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            waits = list(executor.map(lambda _: get_order_wait('10.0.0.1'), range(30)))
+
+        self.assertEqual(waits.count(None), 5)
+
+    @override_settings(
+        ORDER_IP_BUCKET_SIZE=2, ORDER_IP_REFILL_PER_MINUTE=1,
+        ORDER_PHONE_BUCKET_SIZE=1, ORDER_PHONE_REFILL_PER_MINUTE=1,
+    )
+    def test_rejected_order_does_not_spend_tokens(self):
+        other_phone_order = {**self.make_order(1), 'phonenumber': '+79167654321'}
+        statuses = [
+            self.client.post('/api/order/', order, content_type='application/json').status_code
+            for order in [self.make_order(1), self.make_order(1), other_phone_order]
+        ]
+
+        self.assertEqual(statuses, [201, 429, 201])
+
+    @override_settings(ORDER_PHONE_BUCKET_SIZE=1, ORDER_PHONE_REFILL_PER_MINUTE=1)
+    def test_retry_is_not_limited(self):
+        responses = [
+            self.client.post(
+                '/api/order/',
+                self.make_order(1),
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[1].json(), responses[0].json())
+
+    @override_settings(ORDER_ADMISSION_MAX_DB_SECONDS=0.5)
+    def test_orders_are_shed_when_db_is_slow(self):
+        for _ in range(20):
+            db_latency.observe(2)
+
+        with self.assertBudget(max_queries=0):
+            response = self.client.post('/api/order/', self.make_order(1), content_type='application/json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+class ModelResponseOrderTest(PerformanceTestCase):
+    def test_queries_do_not_depend_on_orders_count(self):
+        with self.assertBudget(max_queries=1):
+            response = self.client.get('/api/api/order/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.orders_count)
+
+
+class ArchiveOrdersTest(PerformanceTestCase):
+    def test_orders_changed_after_selection_stay(self):
+        order_ids = list(get_archivable_orders(30).values_list('pk', flat=True)[:10])
+        reopened_id = order_ids[0]
+        Order.objects.filter(pk=reopened_id).update(status='D')
+
+        archived_count = archive_orders_batch(order_ids, 30)
+
+        self.assertEqual(archived_count, len(order_ids) - 1)
+        self.assertTrue(Order.objects.filter(pk=reopened_id).exists())
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), set(order_ids) - {reopened_id})
+
+
+@override_settings(ROOT_URLCONF='star_burger.asgi_urls')
+class AsyncViewsTest(PerformanceTestCase):
+    async def test_product_list_api(self):
+        response = await self.async_client.get('/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), self.products_count)
+
+    async def test_register_order(self):
+        response = await self.async_client.post(
+            '/api/order/',
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, улица Ленина, 1',
+                'products': [{'product': self.products[0].id, 'quantity': 2}],
+            },
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Order.objects.filter(pk=response.json()['id']).aexists())
+
+    async def test_register_order_errors(self):
+        response = await self.async_client.post(
+            '/api/order/',
+            {'firstname': 'Иван', 'products': []},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lastname', response.json())
+
+    @override_settings(ORDER_PHONE_BUCKET_SIZE=1, ORDER_PHONE_REFILL_PER_MINUTE=1)
+    async def test_retry_is_not_limited(self):
+        responses = [
+            await self.async_client.post(
+                '/api/order/',
+                {
+                    'firstname': 'Иван',
+                    'lastname': 'Петров',
+                    'phonenumber': '+79161234567',
+                    'address': 'Москва, улица Ленина, 1',
+                    'products': [{'product': self.products[0].id, 'quantity': 2}],
+                },
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+            for _ in range(2)
+        ]
+
+        self.assertEqual([response.status_code for response in responses], [201, 201])
+        self.assertEqual(responses[1].json(), responses[0].json())
+
+
+class OrderIntakeBufferTest(PerformanceTestCase):
+    def setUp(self):
+        super().setUp()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.log_path = os.path.join(temp_dir.name, 'order_intake.log')
+        settings_override = override_settings(
+            ORDER_INTAKE_BUFFER=True,
+            ORDER_INTAKE_LOG_PATH=self.log_path,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def register_order(self):
+        return self.client.post(
+            '/api/order/',
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, улица Ленина, 1',
+                'products': [{'product': self.products[0].id, 'quantity': 2}],
+            },
+            content_type='application/json',
+        )
+
+    def test_order_is_acknowledged_without_db_writes(self):
+        with self.assertBudget(max_queries=1):
+            response = self.register_order()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Order.objects.filter(intake_id=response.json()['intake_id']).exists())
+
+        self.assertEqual(flush_intake(), 1)
+        order = Order.objects.get(intake_id=response.json()['intake_id'])
+        self.assertEqual(order.orderproducts.get().quantity, 2)
+        self.assertEqual(os.path.getsize(self.log_path), 0)
+
+    def test_failed_append_releases_idempotency_key(self):
+        def register_order():
+            return self.client.post(
+                '/api/order/',
+                {
+                    'firstname': 'Иван',
+                    'lastname': 'Петров',
+                    'phonenumber': '+79161234567',
+                    'address': 'Москва, улица Ленина, 1',
+                    'products': [{'product': self.products[0].id, 'quantity': 2}],
+                },
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+
+        with override_settings(ORDER_INTAKE_LOG_PATH=os.path.join(self.log_path, 'missing', 'order_intake.log')):
+            with self.assertRaises(FileNotFoundError):
+                register_order()
+
+        response = register_order()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(flush_intake(), 1)
+        self.assertTrue(Order.objects.filter(intake_id=response.json()['intake_id']).exists())
+
+    def test_partial_line_after_crash_loses_only_itself(self):
+        with open(self.log_path, 'wb') as log_file:
+            log_file.write('{"intake_id": "broken", "firstname": "Ив'.encode())
+
+        with self.assertLogs('foodcartapp.intake', 'ERROR'):
+            response = self.register_order()
+            self.assertEqual(flush_intake(), 1)
+
+        self.assertTrue(Order.objects.filter(intake_id=response.json()['intake_id']).exists())
+
+    def test_flusher_ends_partial_line(self):
+        with open(self.log_path, 'wb') as log_file:
+            log_file.write(b'{"intake_id": "broken"')
+
+        with self.assertLogs('foodcartapp.intake', 'ERROR'):
+            call_command('flush_order_intake', stdout=io.StringIO())
+
+        self.assertEqual(os.path.getsize(self.log_path), 0)
+
+    def test_retry_during_append_is_not_acknowledged(self):
+        order = {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79161234567',
+            'address': 'Москва, улица Ленина, 1',
+            'products': [{'product': self.products[0].id, 'quantity': 2}],
+        }
+
+        def register_order():
+            return self.client.post(
+                '/api/order/',
+                order,
+                content_type='application/json',
+                headers={'Idempotency-Key': 'retry-1'},
+            )
+
+        retry_responses = []
+
+        def append_order_with_retry(*args, **kwargs):
+            retry_responses.append(register_order())
+            raise OSError('disk is full')
+
+        with patch('foodcartapp.views.append_order', side_effect=append_order_with_retry):
+            with self.assertRaises(OSError):
+                register_order()
+
+        self.assertEqual(retry_responses[0].status_code, 409)
+        self.assertFalse(OrderIdempotencyKey.objects.exists())
+
+    def test_flush_after_crash_does_not_duplicate_orders(self):
+        self.register_order()
+        self.register_order()
+
+        # Процесс упал после коммита первой записи, но до сохранения смещения
+        entries, _ = read_entries(0, limit=1)
+        save_entries(entries)
+        self.register_order()
+
+        self.assertEqual(flush_intake(), 2)
+        self.assertEqual(Order.objects.filter(intake_id__isnull=False).count(), 3)
@@ -0,0 +1,169 @@
+"""Ограничение частоты заказов и сброс нагрузки.
+
+У каждого IP и телефона своё ведро токенов: ведро пополняется с постоянной
+скоростью, а каждый заказ забирает из него токен. Поэтому клиент может
+оформить несколько заказов подряд, но не завалить БД потоком.
+
+Вёдра лежат в общем для воркеров SQLite-файле, а не в кэше: у файлового
+кэша нет атомарного уменьшения, и параллельные запросы тратили бы один и
+тот же токен. Вёдра читаются и меняются одной транзакцией BEGIN IMMEDIATE,
+а токены списываются, только если их хватает во всех вёдрах запроса.
+
+Кроме того, когда журнал приёма заказов не успевают переносить в БД или
+запись заказа в БД стала слишком медленной, новые заказы получают 429 с
+Retry-After, пока система не разгрузится.
+"""
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+from threading import Lock
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from metrics.registry import registry
+
+from .intake import read_offset
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Скользящее среднее времени записи заказа в БД в этом процессе"""
+
+    def __init__(self, weight=0.2):
+        self.weight = weight
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.average = 0.0
+            self.observed_at = 0.0
+
+    def observe(self, seconds):
+        with self.lock:
+            self.average += self.weight * (seconds - self.average)
+            self.observed_at = time.monotonic()
+
+    def is_slow(self):
+        if self.average <= settings.ORDER_ADMISSION_MAX_DB_SECONDS:
+            return False
+        # Без новых замеров среднее не снизится, поэтому изредка пропускаем
+        # заказ, чтобы проверить, не разгрузилась ли БД
+        return time.monotonic() - self.observed_at < settings.ORDER_ADMISSION_RETRY_AFTER
+
+
+db_latency = LatencyTracker()
+
+
+def connect_buckets():
+    connection = sqlite3.connect(settings.ORDER_RATE_LIMIT_DB_PATH, timeout=5, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS buckets ('
+        'scope TEXT NOT NULL, ident TEXT NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL, '
+        'PRIMARY KEY (scope, ident))'
+    )
+    connection.execute('CREATE INDEX IF NOT EXISTS buckets_updated_at ON buckets (updated_at)')
+    return connection
+
+
+def take_tokens(buckets):
+    """Забирает по токену из каждого ведра, только если токены есть во всех
+
+    buckets — список (scope, ident, bucket_size, refill_per_minute). Возвращает
+    (None, 0) или scope первого пустого ведра и сколько секунд ждать токена.
+    """
+    now = time.time()
+    connection = connect_buckets()
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        refilled_buckets = []
+        for scope, ident, bucket_size, refill_per_minute in buckets:
+            refill_per_second = refill_per_minute / 60
+            # Полное ведро не отличается от отсутствующего, поэтому старые не храним
+            connection.execute(
+                'DELETE FROM buckets WHERE scope = ? AND updated_at < ?',
+                (scope, now - bucket_size / refill_per_second),
+            )
+            row = connection.execute(
+                'SELECT tokens, updated_at FROM buckets WHERE scope = ? AND ident = ?',
+                (scope, ident),
+            ).fetchone()
+            tokens, updated_at = row or (bucket_size, now)
+            tokens = min(bucket_size, tokens + (now - updated_at) * refill_per_second)
+            if tokens < 1:
+                connection.execute('COMMIT')
+                return scope, (1 - tokens) / refill_per_second
+            refilled_buckets.append((scope, ident, tokens - 1, now))
+
+        connection.executemany('INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)', refilled_buckets)
+        connection.execute('COMMIT')
+        return None, 0
+    finally:
+        # Без COMMIT транзакция откатится при закрытии соединения
+        connection.close()
+
+
+def reset_buckets():
+    connection = connect_buckets()
+    try:
+        connection.execute('DELETE FROM buckets')
+    finally:
+        connection.close()
+
+
+def get_intake_backlog():
+    """Сколько байт журнала приёма заказов ещё не перенесено в БД"""
+    if not settings.ORDER_INTAKE_BUFFER:
+        return 0
+    try:
+        log_size = os.path.getsize(settings.ORDER_INTAKE_LOG_PATH)
+    except FileNotFoundError:
+        return 0
+    return log_size - read_offset()
+
+
+def get_order_wait(ip, phonenumber=None):
+    """Возвращает None, если заказ можно принять, или сколько секунд клиенту подождать"""
+    if get_intake_backlog() > settings.ORDER_ADMISSION_MAX_INTAKE_BACKLOG:
+        reason, wait = 'intake_backlog', settings.ORDER_ADMISSION_RETRY_AFTER
+    elif db_latency.is_slow():
+        reason, wait = 'db_latency', settings.ORDER_ADMISSION_RETRY_AFTER
+    else:
+        buckets = [('ip', ip, settings.ORDER_IP_BUCKET_SIZE, settings.ORDER_IP_REFILL_PER_MINUTE)]
+        digits = re.sub(r'\D', '', str(phonenumber or ''))
+        if digits:
+            buckets.append(('phone', digits, settings.ORDER_PHONE_BUCKET_SIZE, settings.ORDER_PHONE_REFILL_PER_MINUTE))
+        try:
+            reason, wait = take_tokens(buckets)
+        except sqlite3.Error:
+            # Недоступный файл вёдер не должен останавливать приём заказов
+            logger.exception('Не удалось проверить ограничение частоты заказов')
+            reason, wait = None, 0
+
+    if not wait:
+        return None
+    registry.inc('starburger_orders_rejected_total', {'reason': reason})
+    return math.ceil(wait)
+
+
+def get_phonenumber(data):
+    return data.get('phonenumber') if isinstance(data, dict) else None
+
+
+class OrderThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        self.wait_seconds = get_order_wait(
+            self.get_ident(request),
+            get_phonenumber(request.data),
+        )
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,77 @@
+"""Уменьшенные копии картинок товаров.
+
+Для каждой картинки создаются копии нескольких размеров в WebP и JPEG и
+кладутся в то же хранилище рядом с исходником, в каталог thumbnails. Копии
+делаются при сохранении товара, а для старых товаров — командой
+generate_thumbnails. Запросы к каталогу копии не создают и хранилище не
+проверяют: товар сам помнит, для какой картинки копии готовы.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# Длина большей стороны: small — для списков, medium — для карточек и превью
+THUMBNAIL_SIZES = {
+    'small': 100,
+    'medium': 400,
+}
+THUMBNAIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+THUMBNAIL_QUALITY = 80
+
+
+def get_thumbnail_name(image_name, size, extension):
+    # Хэш из имени исходника остаётся перед расширением: копию тоже можно кэшировать навсегда
+    stem, _ = os.path.splitext(image_name)
+    return f'thumbnails/{size}/{stem}.{extension}'
+
+
+def make_thumbnails(image):
+    """Создаёт все копии картинки, возвращает False, если исходник не открылся"""
+    storage = image.storage
+    try:
+        with storage.open(image.name) as image_file:
+            source = Image.open(image_file)
+            source.load()
+    except OSError:
+        logger.warning('Не удалось открыть картинку %s для уменьшенных копий', image.name)
+        return False
+
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA')
+
+    for size, max_side in THUMBNAIL_SIZES.items():
+        thumbnail = source.copy()
+        thumbnail.thumbnail((max_side, max_side), Image.LANCZOS)
+        for extension, image_format in THUMBNAIL_FORMATS.items():
+            content = io.BytesIO()
+            if image_format == 'JPEG':
+                thumbnail.convert('RGB').save(content, image_format, quality=THUMBNAIL_QUALITY)
+            else:
+                thumbnail.save(content, image_format, quality=THUMBNAIL_QUALITY)
+
+            thumbnail_name = get_thumbnail_name(image.name, size, extension)
+            if storage.exists(thumbnail_name):
+                storage.delete(thumbnail_name)
+            storage.save(thumbnail_name, ContentFile(content.getvalue()))
+    return True
+
+
+def get_thumbnail_urls(image):
+    """Адреса копий в виде {размер: {формат: url}}, сами файлы не проверяются"""
+    return {
+        size: {
+            extension: image.storage.url(get_thumbnail_name(image.name, size, extension))
+            for extension in THUMBNAIL_FORMATS
+        }
+        for size in THUMBNAIL_SIZES
+    }
@@ -1,14 +1,19 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order, model_response_order
+from .views import product_list_api, product_search_api, banners_list_api, register_order, model_response_order
+from .views import restaurant_menu_api, nearest_restaurant_menu_api, archived_orders_api
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
     path('products/', product_list_api),
+    path('products/search/', product_search_api),
+    path('restaurants/<int:restaurant_id>/menu/', restaurant_menu_api),
+    path('menu/', nearest_restaurant_menu_api),
     path('banners/', banners_list_api),
     path('order/', register_order),
 
-    path('api/order/', model_response_order, name='api_order')
+    path('api/order/', model_response_order, name='api_order'),
+    path('archive/orders/', archived_orders_api, name='archived_orders'),
 ]
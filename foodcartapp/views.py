@@ -1,83 +1,257 @@
 import json
 import re
+import time
 
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 
-from .models import Product, Order, OrderProducts
-from .serializers import OrderSerializer
+from metrics.registry import registry
+
+from .banners import get_banners_content
+from .idempotency import (
+    delete_stored_response,
+    get_idempotency_key,
+    get_stored_response,
+    reserve_key,
+    save_reserved_response,
+    store_response,
+)
+from .intake import append_order, new_intake_id
+from .menu import find_nearest_restaurant, get_restaurant_menu
+from .models import ArchivedOrder, Product, Order, OrderProducts, Restaurant, RestaurantMenuItem
+from .search import PRODUCT_SEARCH_LIMIT, search_products
+from .serializers import ArchivedOrderSerializer, OrderSerializer
+from .throttling import OrderThrottle, db_latency
 
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import Throttled
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.renderers import JSONRenderer
-from django.db import transaction
+from django.db import IntegrityError, transaction
 
 
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
+    content, etag = get_banners_content()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.BANNERS_MAX_AGE)
+    return response
+
+
+def get_catalogue_products():
+    available_menu_items = (
+        RestaurantMenuItem.objects
+        .filter(availability=True)
+        .select_related('restaurant')
+        .order_by('restaurant_id')
+    )
+    return (
+        Product.objects
+        .select_related('category')
+        .prefetch_related(Prefetch('menu_items', queryset=available_menu_items))
+        .available()
+    )
+
+
+def dump_product(product):
+    menu_items = product.menu_items.all()
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'thumbnails': product.get_thumbnail_urls(),
+        # Старые клиенты читают одиночный ресторан, поэтому поле оставлено рядом со списком
+        'restaurant': {
+            'id': menu_items[0].restaurant.id,
+            'name': menu_items[0].restaurant.name,
+        } if menu_items else None,
+        'restaurants': [
+            {
+                'id': menu_item.restaurant.id,
+                'name': menu_item.restaurant.name,
+                'price': menu_item.price,
+            }
+            for menu_item in menu_items
+        ],
+    }
+
+
+def product_list_api(request):
+    dumped_products = [dump_product(product) for product in get_catalogue_products()]
+    return JsonResponse(dumped_products, safe=False, json_dumps_params={
         'ensure_ascii': False,
         'indent': 4,
     })
 
 
-def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
+def product_search_api(request):
+    products = (
+        search_products(request.GET.get('q', ''), get_catalogue_products())
+        .order_by('name')[:PRODUCT_SEARCH_LIMIT]
+    )
+    dumped_products = [dump_product(product) for product in products]
     return JsonResponse(dumped_products, safe=False, json_dumps_params={
         'ensure_ascii': False,
         'indent': 4,
     })
 
 
+def restaurant_menu_api(request, restaurant_id):
+    restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+    return JsonResponse({
+        'restaurant': {
+            'id': restaurant.id,
+            'name': restaurant.name,
+        },
+        'menu': get_restaurant_menu(restaurant.id),
+    }, json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+def nearest_restaurant_menu_api(request):
+    try:
+        latitude = float(request.GET['lat'])
+        longitude = float(request.GET['lon'])
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'Укажите координаты доставки в параметрах lat и lon'},
+            status=400,
+            json_dumps_params={'ensure_ascii': False},
+        )
+
+    restaurant, restaurant_distance = find_nearest_restaurant(latitude, longitude)
+    if not restaurant:
+        return JsonResponse(
+            {'error': 'Не найдено ни одного ресторана с известными координатами'},
+            status=404,
+            json_dumps_params={'ensure_ascii': False},
+        )
+
+    return JsonResponse({
+        'restaurant': {
+            'id': restaurant.id,
+            'name': restaurant.name,
+            'distance': round(restaurant_distance, 2),
+        },
+        'menu': get_restaurant_menu(restaurant.id),
+    }, json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+def wants_minimal_response(headers):
+    """Клиент просит вернуть только идентификатор и статус заказа: Prefer: return=minimal"""
+    return 'return=minimal' in headers.get('Prefer', '')
+
+
+def dump_registered_order(validated_data, order_status, **identifiers):
+    """Собирает полный и короткий ответ из уже проверенных данных, не сериализуя заказ заново"""
+    return {
+        'full': {
+            **identifiers,
+            'firstname': validated_data['firstname'],
+            'lastname': validated_data['lastname'],
+            'phonenumber': str(validated_data['phonenumber']),
+            'address': validated_data['address'],
+        },
+        'minimal': {**identifiers, 'status': order_status},
+    }
+
+
+def save_order(data, idempotency_key=None, minimal=False):
+    """Проверяет и сохраняет заказ, бросает ValidationError при ошибках
+
+    Возвращает данные заказа и код ответа: 201, если заказ уже в БД,
+    и 202, если он записан в журнал приёма заказов. Готовый ответ на повтор
+    с тем же idempotency_key view ищут ещё до ограничения частоты, здесь ключ
+    только занимается: параллельный повтор получит первый ответ, а заказ
+    второй раз не создаётся. С minimal в ответе только идентификатор и статус.
+    """
+    serializer = OrderSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+
+    try:
+        if settings.ORDER_INTAKE_BUFFER:
+            intake_id = new_intake_id()
+            response_data = dump_registered_order(
+                serializer.validated_data,
+                Order._meta.get_field('status').default,
+                intake_id=intake_id,
+            )
+            response_status = status.HTTP_202_ACCEPTED
+            if idempotency_key:
+                # Журнал не откатить, поэтому пишем в него, только заняв ключ
+                reserve_key(idempotency_key, data)
+            try:
+                append_order(serializer.validated_data, intake_id)
+            except Exception:
+                if idempotency_key:
+                    # Заказ не попал в журнал: освобождаем ключ, чтобы повтор записал его заново
+                    delete_stored_response(idempotency_key, data)
+                raise
+            if idempotency_key:
+                save_reserved_response(idempotency_key, data, response_data, response_status)
+            return response_data['minimal' if minimal else 'full'], response_status
+
+        started_at = time.perf_counter()
+        with transaction.atomic():
+            order = serializer.save()
+            response_data = dump_registered_order(
+                serializer.validated_data,
+                order.status,
+                id=order.id,
+            )
+            response_status = status.HTTP_201_CREATED
+            if idempotency_key:
+                store_response(idempotency_key, data, response_data, response_status)
+        db_latency.observe(time.perf_counter() - started_at)
+    except IntegrityError:
+        # Параллельный повтор с тем же ключом успел раньше
+        stored_response = idempotency_key and get_stored_response(idempotency_key, data, minimal)
+        if not stored_response:
+            raise
+        return stored_response
+
+    return response_data['minimal' if minimal else 'full'], response_status
+
+
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
-@transaction.atomic
 def register_order(request):
-    serializer = OrderSerializer(data=request.data)
-    serializer.is_valid(raise_exception=True)
+    idempotency_key = get_idempotency_key(request.headers)
+    minimal = wants_minimal_response(request.headers)
+    # Повтор после таймаута должен узнать, что заказ принят, даже если клиент исчерпал лимит
+    stored_response = idempotency_key and get_stored_response(idempotency_key, request.data, minimal)
+    if stored_response:
+        return Response(*stored_response)
 
-    order = serializer.save() 
-    serialized_info = OrderSerializer(order).data
+    throttle = OrderThrottle()
+    if not throttle.allow_request(request, None):
+        raise Throttled(throttle.wait())
 
-    return Response(serialized_info, status=status.HTTP_201_CREATED)
+    with registry.time('starburger_register_order_seconds'):
+        serialized_info, response_status = save_order(request.data, idempotency_key, minimal)
+
+    registry.inc('starburger_orders_registered_total')
+    return Response(serialized_info, status=response_status)
 
 
 @api_view(['GET'])
@@ -85,3 +259,22 @@ def model_response_order(request):
     order = Order.objects.all()
     serializer = OrderSerializer(order, many=True)
     return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def archived_orders_api(request):
+    archived_orders = (
+        ArchivedOrder.objects
+        .prefetch_related('orderproducts')
+        .order_by('-created_at')
+    )
+    phonenumber = request.query_params.get('phonenumber')
+    if phonenumber:
+        archived_orders = archived_orders.filter(phonenumber=phonenumber)
+
+    paginator = LimitOffsetPagination()
+    paginator.default_limit = 100
+    page = paginator.paginate_queryset(archived_orders, request)
+    serializer = ArchivedOrderSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geoinfostore', '0004_address_delete_geocodingaddresses'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='address',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Широта'),
+        ),
+        migrations.AlterField(
+            model_name='address',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Долгота'),
+        ),
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['latitude', 'longitude'], name='address_coordinates_idx'),
+        ),
+    ]
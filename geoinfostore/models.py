@@ -1,23 +1,53 @@
+import math
+
 from django.db import models
 
 
+# Длина градуса меридиана в км
+KM_PER_LATITUDE_DEGREE = 6371.0 * math.pi / 180
+
+
+class AddressQuerySet(models.QuerySet):
+    def with_coordinates(self):
+        return self.filter(latitude__isnull=False, longitude__isnull=False)
+
+    def in_bounding_box(self, south, west, north, east):
+        """Адреса в прямоугольнике между широтами south–north и долготами west–east"""
+        return self.filter(
+            latitude__range=(south, north),
+            longitude__range=(west, east),
+        )
+
+    def near(self, latitude, longitude, radius):
+        """Адреса в квадрате со стороной 2 × radius км вокруг точки
+
+        Точное расстояние до найденных адресов нужно проверить отдельно:
+        углы квадрата дальше radius.
+        """
+        latitude_delta = radius / KM_PER_LATITUDE_DEGREE
+        widest_latitude = min(89.0, abs(latitude) + latitude_delta)
+        longitude_delta = latitude_delta / math.cos(math.radians(widest_latitude))
+        return self.in_bounding_box(
+            latitude - latitude_delta,
+            longitude - longitude_delta,
+            latitude + latitude_delta,
+            longitude + longitude_delta,
+        )
+
+
 class Address(models.Model):
     raw_address = models.CharField(
         'Адрес',
         max_length=255,
         unique=True
     )
-    latitude = models.DecimalField(
+    latitude = models.FloatField(
         'Широта',
-        max_digits=9,
-        decimal_places=6,
         null=True,
         blank=True
     )
-    longitude = models.DecimalField(
+    longitude = models.FloatField(
         'Долгота',
-        max_digits=9,
-        decimal_places=6,
         null=True,
         blank=True
     )
@@ -26,5 +56,18 @@ class Address(models.Model):
         auto_now=True
     )
 
+    objects = AddressQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='address_coordinates_idx'),
+        ]
+
     def __str__(self):
         return f"{self.raw_address} ({self.latitude}, {self.longitude})"
+
+    @property
+    def coordinates(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
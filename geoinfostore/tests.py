@@ -1,3 +1,37 @@
+from unittest import skipUnless
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Address
+
+
+class AddressQueryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.red_square = Address.objects.create(raw_address='Москва, Красная площадь', latitude=55.753544, longitude=37.621202)
+        cls.arbat = Address.objects.create(raw_address='Москва, Арбат', latitude=55.749511, longitude=37.591512)
+        cls.saint_petersburg = Address.objects.create(raw_address='Санкт-Петербург', latitude=59.938951, longitude=30.315635)
+        Address.objects.create(raw_address='Неизвестный адрес')
+
+    def test_in_bounding_box(self):
+        addresses = Address.objects.in_bounding_box(55.5, 37.3, 56.0, 37.9)
+
+        self.assertEqual(set(addresses), {self.red_square, self.arbat})
+
+    def test_near(self):
+        self.assertEqual(set(Address.objects.near(55.7558, 37.6176, radius=1)), {self.red_square})
+        self.assertEqual(set(Address.objects.near(55.7558, 37.6176, radius=5)), {self.red_square, self.arbat})
+
+    def test_coordinates_are_floats(self):
+        address = Address.objects.get(pk=self.red_square.pk)
+
+        self.assertEqual(address.coordinates, (55.753544, 37.621202))
+        self.assertIsNone(Address.objects.get(raw_address='Неизвестный адрес').coordinates)
+        self.assertEqual(Address.objects.with_coordinates().count(), 3)
+
+    @skipUnless(connection.vendor == 'sqlite', 'На маленькой таблице PostgreSQL может выбрать полный просмотр')
+    def test_bounding_box_uses_index(self):
+        plan = Address.objects.near(55.7558, 37.6176, radius=5).explain()
+
+        self.assertIn('address_coordinates_idx', plan)
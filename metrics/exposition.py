@@ -0,0 +1,50 @@
+import re
+from collections import defaultdict
+
+from .registry import METRICS
+
+
+LE_LABEL_RE = re.compile(r'le="([^"]+)"')
+
+
+def format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def get_sample_sort_key(sample):
+    name, labels, _ = sample
+    le_match = LE_LABEL_RE.search(labels)
+    le = float(le_match.group(1)) if le_match else 0
+    return name, LE_LABEL_RE.sub('', labels), le
+
+
+def get_metric_name(sample_name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        base_name = sample_name.removesuffix(suffix)
+        if base_name != sample_name and METRICS.get(base_name, ('',))[0] == 'histogram':
+            return base_name
+    return sample_name
+
+
+def render_metrics(samples, gauges):
+    """Текстовый формат экспозиции Prometheus"""
+    samples_by_metric = defaultdict(list)
+    for sample in samples:
+        samples_by_metric[get_metric_name(sample[0])].append(sample)
+
+    lines = []
+    for metric_name, (metric_type, description) in METRICS.items():
+        lines.append(f'# HELP {metric_name} {description}')
+        lines.append(f'# TYPE {metric_name} {metric_type}')
+        for name, labels, value in sorted(samples_by_metric[metric_name], key=get_sample_sort_key):
+            lines.append(f'{name}{{{labels}}} {format_value(value)}' if labels else f'{name} {format_value(value)}')
+
+    for metric_name, (description, values) in gauges.items():
+        lines.append(f'# HELP {metric_name} {description}')
+        lines.append(f'# TYPE {metric_name} gauge')
+        for labels, value in values:
+            lines.append(f'{metric_name}{{{labels}}} {format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
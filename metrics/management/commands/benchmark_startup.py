@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from metrics.startup import (
+    LAZY_MODULES,
+    STARTUP_TIME_BUDGET,
+    get_import_cost_by_package,
+    measure_startup,
+)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет запуск нового процесса Django и стоимость импортов по пакетам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        measurements = [measure_startup() for _ in range(options['repeat'])]
+        startup_time, modules = min(measurements, key=lambda measurement: measurement[0])
+
+        import_cost = get_import_cost_by_package(modules)
+        self.stdout.write(f'{"пакет":<24}{"импорт, мс":>12}')
+        for package, cost in sorted(import_cost.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{package:<24}{cost * 1000:>12.1f}')
+
+        self.stdout.write(
+            f'\nИмпорты всего: {sum(import_cost.values()) * 1000:.1f} мс, '
+            f'запуск процесса: {startup_time * 1000:.1f} мс '
+            f'при бюджете {STARTUP_TIME_BUDGET * 1000:.0f} мс'
+        )
+
+        eager_modules = [module for module in LAZY_MODULES if module in modules]
+        if eager_modules:
+            raise CommandError(f'При запуске импортируются: {", ".join(eager_modules)}')
+        if startup_time > STARTUP_TIME_BUDGET:
+            raise CommandError('Запуск не уложился в бюджет')
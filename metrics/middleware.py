@@ -0,0 +1,63 @@
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .timing import RequestTiming, TimingHistory, current_request_timing
+
+
+timing_history = TimingHistory(settings.REQUEST_TIMING_WINDOW)
+
+
+def get_view_name(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if not resolver_match:
+        return 'unresolved'
+    return resolver_match.route
+
+
+class RequestTimingMiddleware:
+    """Замеряет выборку запросов и отдаёт замеры в заголовке Server-Timing"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timing = RequestTiming()
+        token = current_request_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_timing.reset(token)
+
+        return self.record(request, response, timing)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timing = RequestTiming()
+        token = current_request_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_timing.reset(token)
+
+        return self.record(request, response, timing)
+
+    def record(self, request, response, timing):
+        timing.finish()
+        timing_history.add(get_view_name(request), timing)
+        response['Server-Timing'] = timing.as_server_timing()
+        return response
@@ -0,0 +1,148 @@
+import atexit
+import logging
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock, Thread
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+HISTOGRAM_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+METRICS = {
+    'starburger_orders_registered_total': (
+        'counter', 'Оформленные через API заказы',
+    ),
+    'starburger_orders_rejected_total': (
+        'counter', 'Отклонённые с кодом 429 заказы по причинам: ip, phone, intake_backlog, db_latency',
+    ),
+    'starburger_register_order_seconds': (
+        'histogram', 'Время обработки запроса на оформление заказа',
+    ),
+    'starburger_geocoder_lookups_total': (
+        'counter', 'Поиск координат адреса: hit — найдены в БД, miss — нет',
+    ),
+    'starburger_geocoder_requests_total': (
+        'counter', 'Запросы к API геокодера',
+    ),
+    'starburger_view_orders_seconds': (
+        'histogram', 'Время отрисовки страницы заказов менеджера',
+    ),
+    'starburger_menu_cache_total': (
+        'counter', 'Чтения меню ресторана из кэша: hit — из кэша, miss — собрано заново',
+    ),
+}
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """Счётчики процесса, которые фоновый поток сбрасывает в общий SQLite-файл.
+
+    Так /metrics видит сумму по всем воркерам gunicorn, а инкремент в запросе
+    стоит лишь сложения в памяти и не трогает диск.
+    """
+
+    def __init__(self):
+        self.pending = defaultdict(float)
+        self.lock = Lock()
+        self.flusher_pid = None
+
+    def start_flusher(self):
+        # Потоки не переживают fork, поэтому поток запускается в каждом воркере при первом замере
+        pid = os.getpid()
+        with self.lock:
+            if self.flusher_pid == pid:
+                return
+            self.flusher_pid = pid
+        Thread(target=self.flush_periodically, name='metrics-flusher', daemon=True).start()
+        atexit.register(self.flush)
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось сбросить метрики')
+
+    def inc(self, name, labels=None, value=1):
+        with self.lock:
+            self.pending[(name, format_labels(labels or {}))] += value
+        self.start_flusher()
+
+    def observe(self, name, value, labels=None):
+        labels = labels or {}
+        with self.lock:
+            for bucket in HISTOGRAM_BUCKETS:
+                bucket_labels = format_labels({**labels, 'le': bucket})
+                self.pending[(f'{name}_bucket', bucket_labels)] += int(value <= bucket)
+            self.pending[(f'{name}_bucket', format_labels({**labels, 'le': '+Inf'}))] += 1
+            self.pending[(f'{name}_sum', format_labels(labels))] += value
+            self.pending[(f'{name}_count', format_labels(labels))] += 1
+        self.start_flusher()
+
+    @contextmanager
+    def time(self, name, labels=None):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, labels)
+
+    def connect(self):
+        connection = sqlite3.connect(settings.METRICS_DB_PATH, timeout=5)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            'name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, '
+            'PRIMARY KEY (name, labels))'
+        )
+        return connection
+
+    def flush(self):
+        """Сбрасывает счётчики в файл; если файл недоступен, оставляет их до следующей попытки"""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(float)
+        if not pending:
+            return True
+
+        try:
+            connection = self.connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                        'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                        [(name, labels, value) for (name, labels), value in pending.items()],
+                    )
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            logger.warning('Не удалось записать метрики в %s', settings.METRICS_DB_PATH, exc_info=True)
+            with self.lock:
+                for key, value in pending.items():
+                    self.pending[key] += value
+            return False
+        return True
+
+    def collect(self):
+        """Возвращает накопленные всеми процессами значения"""
+        self.flush()
+        connection = self.connect()
+        try:
+            return connection.execute(
+                'SELECT name, labels, value FROM samples ORDER BY name, labels'
+            ).fetchall()
+        finally:
+            connection.close()
+
+
+registry = MetricsRegistry()
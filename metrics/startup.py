@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+STARTUP_SCRIPT = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+# Время до готовности обслуживать запросы у свежего процесса, в секундах
+STARTUP_TIME_BUDGET = 2.0
+
+# Эти библиотеки нужны редко и должны грузиться при первом использовании.
+# requests сюда не входит: его всё равно импортирует rest_framework.compat
+LAZY_MODULES = ['geopy']
+
+
+def parse_importtime(output):
+    """Разбирает вывод python -X importtime: собственное время модулей в секундах"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, module_name = line.removeprefix('import time:').split('|')
+        modules[module_name.strip()] = int(self_time) / 1_000_000
+    return modules
+
+
+def get_import_cost_by_package(modules):
+    import_cost = defaultdict(float)
+    for module_name, self_time in modules.items():
+        import_cost[module_name.split('.')[0]] += self_time
+    return dict(import_cost)
+
+
+def measure_startup():
+    """Поднимает Django и URLconf в новом процессе, возвращает время запуска и импортированные модули"""
+    started_at = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=True,
+    )
+    return time.perf_counter() - started_at, parse_importtime(process.stderr)
@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .registry import registry
+
+
+class MetricsTestRunner(DiscoverRunner):
+    """Не даёт тестам писать в рабочие файлы METRICS_DB_PATH и ORDER_RATE_LIMIT_DB_PATH"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.metrics_settings = override_settings(
+            METRICS_DB_PATH=os.path.join(self.metrics_dir.name, 'metrics.sqlite3'),
+            ORDER_RATE_LIMIT_DB_PATH=os.path.join(self.metrics_dir.name, 'rate_limit.sqlite3'),
+        )
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # Иначе оставшиеся счётчики запишутся в рабочий файл при выходе из процесса
+        registry.pending.clear()
+        self.metrics_settings.disable()
+        self.metrics_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
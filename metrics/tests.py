@@ -0,0 +1,108 @@
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from .registry import MetricsRegistry, registry
+from .startup import LAZY_MODULES, measure_startup
+
+
+class RequestTimingTest(TestCase):
+    def test_server_timing_header(self):
+        response = self.client.get('/api/banners/')
+
+        self.assertIn('app;dur=', response['Server-Timing'])
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    @override_settings(ROOT_URLCONF='star_burger.asgi_urls')
+    async def test_queries_from_async_views_are_counted(self):
+        response = await self.async_client.get('/api/products/')
+
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    def test_timings_are_visible_only_to_staff(self):
+        self.client.get('/api/banners/')
+
+        response = self.client.get('/metrics/timings/')
+        self.assertEqual(response.status_code, 302)
+
+        staff = User.objects.create_user('manager', password='password', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/metrics/timings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('api/banners/', response.json())
+
+
+@override_settings(METRICS_TOKEN='secret')
+class PrometheusMetricsTest(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.metrics_path = os.path.join(temp_dir.name, 'metrics.sqlite3')
+        settings_override = override_settings(METRICS_DB_PATH=self.metrics_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        registry.pending.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = 'Bearer secret'
+
+    def test_counters_from_all_processes_are_summed(self):
+        first_worker, second_worker = MetricsRegistry(), MetricsRegistry()
+        first_worker.inc('starburger_orders_registered_total')
+        second_worker.inc('starburger_orders_registered_total', value=2)
+        first_worker.flush()
+        second_worker.flush()
+
+        response = self.client.get('/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('starburger_orders_registered_total 3\n', response.content.decode())
+
+    def test_histogram_and_gauges(self):
+        worker = MetricsRegistry()
+        worker.observe('starburger_register_order_seconds', 0.03)
+        worker.flush()
+
+        content = self.client.get('/metrics/').content.decode()
+
+        self.assertIn('starburger_register_order_seconds_bucket{le="0.025"} 0', content)
+        self.assertIn('starburger_register_order_seconds_bucket{le="0.05"} 1', content)
+        self.assertIn('starburger_register_order_seconds_count 1', content)
+        self.assertIn('starburger_open_orders{status="U"} 0', content)
+
+    def test_access_requires_token_or_staff(self):
+        self.client.defaults.pop('HTTP_AUTHORIZATION')
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 403)
+
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics/').status_code, 403)
+            staff = User.objects.create_user('manager', password='password', is_staff=True)
+            self.client.force_login(staff)
+            self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    @override_settings(METRICS_DB_PATH='/nonexistent/metrics.sqlite3')
+    def test_unwritable_file_does_not_lose_counts(self):
+        worker = MetricsRegistry()
+        worker.flusher_pid = os.getpid()  # сбрасываем вручную, без фонового потока
+        worker.inc('starburger_orders_registered_total', value=2)
+
+        self.assertFalse(worker.flush())
+        self.assertEqual(self.client.get('/metrics/').status_code, 503)
+
+        worker.inc('starburger_orders_registered_total')
+        with override_settings(METRICS_DB_PATH=self.metrics_path):
+            self.assertTrue(worker.flush())
+            content = self.client.get('/metrics/').content.decode()
+        self.assertIn('starburger_orders_registered_total 3\n', content)
+
+
+class StartupImportsTest(TestCase):
+    def test_rarely_used_modules_are_imported_lazily(self):
+        # Время запуска здесь не проверяем: на загруженном CI оно плавает,
+        # его бюджет проверяет команда benchmark_startup
+        _, modules = measure_startup()
+
+        for module_name in LAZY_MODULES:
+            self.assertNotIn(module_name, modules)
@@ -0,0 +1,126 @@
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+current_request_timing = ContextVar('current_request_timing', default=None)
+
+
+class RequestTiming:
+    """Время обработки запроса, время и число SQL-запросов, время внешних вызовов"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.duration = None
+        self.db_time = 0
+        self.queries_count = 0
+        self.external_time = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started_at
+            self.queries_count += 1
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started_at
+
+    def as_server_timing(self):
+        metrics = [
+            f'app;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries_count} queries"',
+        ]
+        metrics.extend(
+            f'{name};dur={elapsed * 1000:.1f}'
+            for name, elapsed in self.external_time.items()
+        )
+        return ', '.join(metrics)
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current_request_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install_query_timing(sender, connection, **kwargs):
+    """Подключает замер SQL к каждому новому соединению
+
+    Соединения у Django свои в каждом потоке, а под ASGI ORM работает в
+    потоках sync_to_async. Замер берёт текущий запрос из contextvar, который
+    sync_to_async переносит в поток, поэтому видит запросы из любого потока.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def track_external_call(name):
+    """Засекает время внешнего вызова, например, к геокодеру, внутри текущего запроса"""
+    timing = current_request_timing.get()
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing:
+            timing.external_time[name] += time.perf_counter() - started_at
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга"""
+    ordered_values = sorted(values)
+    rank = max(0, round(percent / 100 * len(ordered_values) + 0.5) - 1)
+    return ordered_values[min(rank, len(ordered_values) - 1)]
+
+
+class TimingHistory:
+    """Последние замеры по каждому view в памяти процесса"""
+
+    def __init__(self, window):
+        self.window = window
+        self.samples = {}
+        self.lock = Lock()
+
+    def add(self, view_name, timing):
+        samples = self.samples.get(view_name)
+        if samples is None:
+            with self.lock:
+                samples = self.samples.setdefault(view_name, deque(maxlen=self.window))
+        samples.append((
+            timing.duration * 1000,
+            timing.db_time * 1000,
+            timing.queries_count,
+            sum(timing.external_time.values()) * 1000,
+        ))
+
+    def summary(self):
+        summary = {}
+        for view_name, samples in list(self.samples.items()):
+            samples = list(samples)
+            if not samples:
+                continue
+            durations = [duration for duration, _, _, _ in samples]
+
+            histogram = {}
+            for bucket in HISTOGRAM_BUCKETS_MS:
+                histogram[f'le_{bucket}'] = sum(1 for duration in durations if duration <= bucket)
+            histogram['le_inf'] = len(durations)
+
+            summary[view_name] = {
+                'count': len(samples),
+                'p50_ms': round(percentile(durations, 50), 2),
+                'p95_ms': round(percentile(durations, 95), 2),
+                'p99_ms': round(percentile(durations, 99), 2),
+                'avg_db_ms': round(sum(sample[1] for sample in samples) / len(samples), 2),
+                'avg_queries': round(sum(sample[2] for sample in samples) / len(samples), 2),
+                'avg_external_ms': round(sum(sample[3] for sample in samples) / len(samples), 2),
+                'histogram_ms': histogram,
+            }
+        return summary
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import prometheus_metrics, request_timings
+
+
+app_name = 'metrics'
+
+urlpatterns = [
+    path('', prometheus_metrics, name='prometheus_metrics'),
+    path('timings/', request_timings, name='request_timings'),
+]
@@ -0,0 +1,72 @@
+import logging
+import sqlite3
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+
+from foodcartapp.models import Order
+
+from .exposition import render_metrics
+from .middleware import timing_history
+from .registry import format_labels, registry
+
+
+logger = logging.getLogger(__name__)
+
+
+@staff_member_required
+def request_timings(request):
+    return JsonResponse(timing_history.summary(), json_dumps_params={
+        'ensure_ascii': False,
+        'indent': 4,
+    })
+
+
+def collect_gauges():
+    open_orders = (
+        Order.objects
+        .exclude(status='V')
+        .values('status')
+        .annotate(orders_count=Count('id'))
+    )
+    orders_count_by_status = {
+        row['status']: row['orders_count'] for row in open_orders
+    }
+    return {
+        'starburger_open_orders': (
+            'Незавершённые заказы по статусам',
+            [
+                (format_labels({'status': status}), orders_count_by_status.get(status, 0))
+                for status, _ in Order.ORDER_STATUS
+                if status != 'V'
+            ],
+        ),
+    }
+
+
+def has_metrics_access(request):
+    if request.user.is_staff:
+        return True
+    authorization = request.headers.get('Authorization', '')
+    return bool(settings.METRICS_TOKEN) and constant_time_compare(
+        authorization, f'Bearer {settings.METRICS_TOKEN}',
+    )
+
+
+def prometheus_metrics(request):
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+
+    try:
+        samples = registry.collect()
+    except sqlite3.Error:
+        logger.exception('Не удалось прочитать метрики из %s', settings.METRICS_DB_PATH)
+        return HttpResponse('Метрики недоступны', status=503, content_type='text/plain; charset=utf-8')
+
+    return HttpResponse(
+        render_metrics(samples, collect_gauges()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
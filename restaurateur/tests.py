@@ -1,3 +1,303 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import skipIf, skipUnless
+from unittest.mock import AsyncMock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.admin import EstimatedCountPaginator
+from foodcartapp.fake_data import create_orders
+from foodcartapp.models import Order
+from foodcartapp.tests import PerformanceTestCase
+from geoinfostore.models import Address
+from restaurateur.views import aget_or_create_addresses
+from star_burger.replica import STICKY_COOKIE_NAME, ReplicaMiddleware, ReplicaRouter
+from star_burger.static_views import serve_file
+from star_burger.storage import ContentAddressedStorage, compress_file
+
+
+GEO_OBJECTS = [{'GeoObject': {'Point': {'pos': '37.617635 55.755814'}}}]
+
+
+class ManagerPagesTest(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+
+    def test_view_products(self):
+        with self.assertBudget(max_queries=5):
+            response = self.client.get('/manager/products/')
+        self.assertEqual(response.status_code, 200)
+
+    @patch('restaurateur.views.aget_geo_objects', new_callable=AsyncMock, return_value=GEO_OBJECTS)
+    def test_view_orders_geocodes_each_address_once(self, get_geo_objects):
+        self.client.get('/manager/orders/')
+        addresses_count = len({call.args[2] for call in get_geo_objects.call_args_list})
+        self.assertEqual(get_geo_objects.call_count, addresses_count)
+
+        get_geo_objects.reset_mock()
+        with self.assertBudget(max_queries=9):
+            response = self.client.get('/manager/orders/')
+        self.assertEqual(response.status_code, 200)
+        get_geo_objects.assert_not_awaited()
+
+    def test_view_orders_survives_geocoder_errors(self):
+        failed_address = self.restaurants[0].address
+
+        async def get_geo_objects(client, apikey, address):
+            if address == failed_address:
+                raise ConnectionError('geocoder is down')
+            return GEO_OBJECTS
+
+        with patch('restaurateur.views.aget_geo_objects', side_effect=get_geo_objects):
+            response = self.client.get('/manager/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Address.objects.filter(raw_address=failed_address).exists())
+        self.assertTrue(Address.objects.filter(raw_address=self.restaurants[1].address, latitude__isnull=False).exists())
+
+    @patch('restaurateur.views.aget_geo_objects', new_callable=AsyncMock, return_value=GEO_OBJECTS)
+    def test_zero_coordinates_are_known(self, get_geo_objects):
+        Address.objects.create(raw_address='Гринвич', latitude=51.4779, longitude=0.0)
+
+        coordinates = async_to_sync(aget_or_create_addresses)('apikey', ['Гринвич'])
+
+        self.assertEqual(coordinates, {'Гринвич': (51.4779, 0.0)})
+        get_geo_objects.assert_not_awaited()
+
+    @patch('restaurateur.views.aget_geo_objects', new_callable=AsyncMock, return_value=GEO_OBJECTS)
+    def test_view_orders_queries_do_not_depend_on_orders_count(self, get_geo_objects):
+        self.client.get('/manager/orders/')
+        create_orders(self.orders_count, self.restaurants, self.products, seed=2)
+        self.client.get('/manager/orders/')
+
+        with self.assertBudget(max_queries=9):
+            response = self.client.get('/manager/orders/')
+        self.assertEqual(response.status_code, 200)
+
+    @patch('restaurateur.views.aget_geo_objects', new_callable=AsyncMock, return_value=GEO_OBJECTS)
+    def test_view_orders_skips_restaurants_outside_delivery_zone(self, get_geo_objects):
+        far_restaurant, near_restaurant = self.restaurants[:2]
+        Address.objects.create(raw_address=far_restaurant.address, latitude=59.938951, longitude=30.315635)
+        for restaurant in [far_restaurant, near_restaurant]:
+            restaurant.delivery_radius = 5
+            restaurant.save()
+        # Зона ближнего ресторана строится, когда геокодер находит его адрес
+        self.client.get('/manager/orders/')
+
+        with self.assertBudget(max_queries=10):
+            response = self.client.get('/manager/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, f'{far_restaurant.name} - ')
+        self.assertContains(response, f'{near_restaurant.name} - 0.00 км')
+
+
+class AdminChangelistTest(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser('admin', password='password')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_order_changelist(self):
+        with self.assertBudget(max_queries=5):
+            response = self.client.get('/admin/foodcartapp/order/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_filtered_order_changelist(self):
+        restaurant = self.restaurants[0]
+        with self.assertBudget(max_queries=5):
+            response = self.client.get(
+                f'/admin/foodcartapp/order/?status__exact=V&restaurant__id__exact={restaurant.id}'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_order_search(self):
+        for query in ['abc', '+79161234567', '1', '9' * 30]:
+            response = self.client.get('/admin/foodcartapp/order/', {'q': query})
+            self.assertEqual(response.status_code, 200)
+
+        order = Order.objects.first()
+        response = self.client.get('/admin/foodcartapp/order/', {'q': order.id})
+        self.assertContains(response, f'/admin/foodcartapp/order/{order.id}/change/')
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса зависит от СУБД')
+    def test_order_search_by_phone_uses_index(self):
+        order = Order.objects.first()
+        request = RequestFactory().get('/admin/foodcartapp/order/')
+        order_admin = admin.site._registry[Order]
+
+        queryset, _ = order_admin.get_search_results(request, Order.objects.all(), str(order.phonenumber))
+        plan = queryset.explain()
+
+        self.assertIn(order, queryset)
+        self.assertIn('USING INDEX order_phonenumber_idx', plan)
+        self.assertNotIn('SCAN foodcartapp_order', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Оценку числа строк даёт только статистика PostgreSQL')
+    @patch.object(EstimatedCountPaginator, 'exact_count_limit', 10)
+    def test_order_count_is_estimated(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE foodcartapp_order')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/foodcartapp/order/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    @skipIf(connection.vendor == 'postgresql', 'В PostgreSQL большая таблица считается по статистике')
+    @patch.object(EstimatedCountPaginator, 'exact_count_limit', 10)
+    def test_order_count_is_exact_after_archival(self):
+        Order.objects.exclude(pk=Order.objects.latest('pk').pk).delete()
+
+        paginator = EstimatedCountPaginator(Order.objects.order_by('pk'), 100)
+
+        self.assertEqual(paginator.count, 1)
+        self.assertEqual(paginator.num_pages, 1)
+
+    def test_order_change_view(self):
+        order = Order.objects.filter(orderproducts__isnull=False).first()
+        with self.assertBudget(max_queries=6):
+            response = self.client.get(f'/admin/foodcartapp/order/{order.id}/change/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_restaurant_change_view(self):
+        restaurant = self.restaurants[0]
+        with self.assertBudget(max_queries=5):
+            response = self.client.get(f'/admin/foodcartapp/restaurant/{restaurant.id}/change/')
+
+        self.assertEqual(response.status_code, 200)
+        product = restaurant.menu_items.select_related('product').first().product
+        self.assertContains(response, f'<option value="{product.id}" selected>{product.name}</option>')
+
+    def test_product_change_view(self):
+        product = self.products[0]
+        with self.assertBudget(max_queries=6):
+            response = self.client.get(f'/admin/foodcartapp/product/{product.id}/change/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_changelist(self):
+        with self.assertBudget(max_queries=6):
+            response = self.client.get('/admin/foodcartapp/product/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_search(self):
+        with self.assertBudget(max_queries=6):
+            response = self.client.get('/admin/foodcartapp/product/', {'q': 'БУРГЕР 4'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product.name for product in response.context['cl'].result_list],
+            ['Бургер 4', 'Бургер 40'],
+        )
+
+    def test_restaurant_changelist(self):
+        with self.assertBudget(max_queries=5):
+            response = self.client.get('/admin/foodcartapp/restaurant/')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.read_databases = []
+
+        def get_response(request):
+            self.read_databases.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        self.middleware = ReplicaMiddleware(get_response)
+
+    def test_get_reads_from_replica(self):
+        response = self.middleware(self.factory.get('/manager/orders/'))
+
+        self.assertEqual(self.read_databases, ['replica'])
+        self.assertNotIn(STICKY_COOKIE_NAME, response.cookies)
+
+    def test_post_reads_from_primary_and_sticks(self):
+        response = self.middleware(self.factory.post('/admin/foodcartapp/order/1/change/'))
+
+        self.assertEqual(self.read_databases, [None])
+        self.assertEqual(response.cookies[STICKY_COOKIE_NAME]['max-age'], 10)
+
+    def test_get_after_edit_reads_from_primary(self):
+        request = self.factory.get('/manager/orders/')
+        request.COOKIES[STICKY_COOKIE_NAME] = '1'
+        self.middleware(request)
+
+        self.assertEqual(self.read_databases, [None])
+
+    def test_outside_request_reads_from_primary(self):
+        self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_primary_only_apps(self):
+        def get_response(request):
+            self.read_databases.append(self.router.db_for_read(Address))
+            return HttpResponse()
+
+        ReplicaMiddleware(get_response)(self.factory.get('/manager/orders/'))
+
+        self.assertEqual(self.read_databases, [None])
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Order), 'default')
+
+
+class StaticFilesTest(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = temp_dir.name
+        self.factory = RequestFactory()
+
+    def test_uploads_are_named_by_content(self):
+        storage = ContentAddressedStorage(location=self.root)
+
+        first_name = storage.save('banners/burger.jpg', ContentFile(b'burger'))
+        same_name = storage.save('banners/burger.jpg', ContentFile(b'burger'))
+        other_name = storage.save('banners/burger.jpg', ContentFile(b'other burger'))
+
+        self.assertRegex(first_name, r'^banners/burger\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(same_name, first_name)
+        self.assertNotEqual(other_name, first_name)
+
+    def test_hashed_file_is_cached_forever_and_compressed(self):
+        path = os.path.join(self.root, 'app.0123456789ab.js')
+        with open(path, 'w') as file:
+            file.write('console.log("star burger");' * 100)
+        compress_file(path)
+
+        request = self.factory.get('/static/app.0123456789ab.js', headers={'Accept-Encoding': 'gzip'})
+        response = serve_file(request, 'app.0123456789ab.js', self.root)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_unhashed_file_is_revalidated(self):
+        with open(os.path.join(self.root, 'icon.png'), 'wb') as file:
+            file.write(b'png')
+
+        response = serve_file(self.factory.get('/static/icon.png'), 'icon.png', self.root)
+
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('no-cache', response['Cache-Control'])
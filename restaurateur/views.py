@@ -1,9 +1,7 @@
-import requests
+import asyncio
 import logging
 
-from geopy import distance
-from operator import itemgetter
-
+from asgiref.sync import async_to_sync
 from django import forms
 from django.shortcuts import redirect, render
 from django.views import View
@@ -13,8 +11,11 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.conf import settings
 
+from foodcartapp.delivery_zones import encode_geohash, get_restaurant_ids_by_cell
 from foodcartapp.models import Product, Restaurant, Order
 from geoinfostore.models import Address  
+from metrics.registry import registry
+from metrics.timing import track_external_call
 
 
 class Login(forms.Form):
@@ -70,7 +71,7 @@ def is_manager(user):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    products = list(Product.objects.select_related('category').prefetch_related('menu_items'))
 
     products_with_restaurant_availability = []
     for product in products:
@@ -97,9 +98,14 @@ def view_restaurants(request):
     })
 
 
-def get_geo_objects(apikey, address):
+# Сколько запросов к геокодеру держать одновременно, чтобы не упереться в его лимиты
+GEOCODER_CONCURRENCY = 5
+
+
+async def aget_geo_objects(client, apikey, address):
     """Запрашивает геообъекты у Яндекс.Карт"""
-    response = requests.get("https://geocode-maps.yandex.ru/1.x", params={
+    registry.inc('starburger_geocoder_requests_total')
+    response = await client.get("https://geocode-maps.yandex.ru/1.x", params={
         "geocode": address,
         "apikey": apikey,
         "format": "json",
@@ -110,46 +116,89 @@ def get_geo_objects(apikey, address):
     return feature_members
 
 
-def get_or_create_address(apikey, address):
-    """Возвращает координаты адреса (берёт из БД или запрашивает у API)"""
-    obj, created = Address.objects.get_or_create(raw_address=address)
-
-    if not obj.latitude or not obj.longitude:
-        geo_objects = get_geo_objects(apikey, address)
-        if not geo_objects:
-            logging.warning(f'Не удалось найти координаты для адреса: {address}')
-            return None
-
-        geo_object = geo_objects[0]['GeoObject']['Point']['pos']
-        lon_str, lat_str = geo_object.split()
-        obj.latitude, obj.longitude = lat_str, lon_str
-        obj.save()
+async def aget_or_create_addresses(apikey, raw_addresses):
+    """Возвращает координаты адресов: берёт их из БД одним запросом, недостающие запрашивает у API параллельно"""
+    raw_addresses = {raw_address for raw_address in raw_addresses if raw_address}
+    known_addresses = {
+        address.raw_address: address
+        async for address in Address.objects.filter(raw_address__in=raw_addresses)
+    }
+    addresses = [
+        known_addresses.get(raw_address) or Address(raw_address=raw_address)
+        for raw_address in raw_addresses
+    ]
 
-    return (obj.latitude, obj.longitude)
+    missing_addresses = [
+        address for address in addresses
+        if address.coordinates is None
+    ]
+    registry.inc(
+        'starburger_geocoder_lookups_total',
+        {'result': 'hit'},
+        len(addresses) - len(missing_addresses),
+    )
+    registry.inc('starburger_geocoder_lookups_total', {'result': 'miss'}, len(missing_addresses))
+
+    if missing_addresses:
+        import httpx  # тяжёлый импорт, грузим при первом обращении к геокодеру
+
+        semaphore = asyncio.Semaphore(GEOCODER_CONCURRENCY)
+
+        async def ageocode(client, address):
+            async with semaphore:
+                return await aget_geo_objects(client, apikey, address.raw_address)
+
+        with track_external_call('geocoder'):
+            async with httpx.AsyncClient(timeout=10) as client:
+                # Ошибка по одному адресу не должна выбрасывать координаты остальных
+                found_geo_objects = await asyncio.gather(*[
+                    ageocode(client, address)
+                    for address in missing_addresses
+                ], return_exceptions=True)
+
+        for address, geo_objects in zip(missing_addresses, found_geo_objects):
+            if isinstance(geo_objects, Exception):
+                # Не сохраняем адрес, чтобы запросить его снова при следующем открытии страницы
+                logging.warning(f'Геокодер не ответил для адреса {address.raw_address}: {geo_objects!r}')
+                continue
+
+            if not geo_objects:
+                logging.warning(f'Не удалось найти координаты для адреса: {address.raw_address}')
+                if not address.pk:
+                    await address.asave()
+                continue
+
+            geo_object = geo_objects[0]['GeoObject']['Point']['pos']
+            lon_str, lat_str = geo_object.split()
+            address.latitude, address.longitude = float(lat_str), float(lon_str)
+            await address.asave()
+
+    return {
+        address.raw_address: address.coordinates
+        for address in addresses
+        if address.coordinates is not None
+    }
 
 
-def distance_calculation(apikey, first_address, second_address):
-    """Считает расстояние между двумя адресами в км"""
-    first_coords = get_or_create_address(apikey, first_address)
-    if not first_coords:
+def distance_calculation(first_coords, second_coords):
+    """Считает расстояние между двумя точками в км"""
+    if not first_coords or not second_coords:
         return None
 
-    second_coords = get_or_create_address(apikey, second_address)
-    if not second_coords:
-        return None
+    from geopy import distance  # нужен редко, поэтому не грузим его при запуске воркера
 
-    return distance.distance(
-        (float(first_coords[0]), float(first_coords[1])),
-        (float(second_coords[0]), float(second_coords[1]))
-    ).km
+    return distance.distance(first_coords, second_coords).km
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
+@registry.time('starburger_view_orders_seconds')
 def view_orders(request):
     yandex_api_key = settings.YANDEX_API_KEY
 
-    orders = (
+    orders = list(
         Order.objects
+        .exclude(status='V')
+        .order_by('created_at')
         .with_total_price()
         .select_related('restaurant')
         .prefetch_related('orderproducts__product')
@@ -168,6 +217,31 @@ def view_orders(request):
         }
         restaurant_products_map[restaurant.id] = available_products
 
+    unassigned_orders_addresses = [
+        order.address for order in orders
+        if not order.restaurant and order.status != 'D'
+    ]
+    coordinates = async_to_sync(aget_or_create_addresses)(
+        yandex_api_key,
+        [restaurant.address for restaurant in restaurants] + unassigned_orders_addresses
+    )
+
+    # Заказ с известными координатами сверяем только с ресторанами, в зону которых он попал,
+    # и с теми, у кого зоны нет: без радиуса или с неизвестным адресом
+    restaurants_by_id = {restaurant.id: restaurant for restaurant in restaurants}
+    unzoned_restaurants = [
+        restaurant for restaurant in restaurants
+        if not restaurant.delivery_radius or restaurant.address not in coordinates
+    ]
+    order_cells = {}
+    if len(unzoned_restaurants) < len(restaurants):
+        order_cells = {
+            address: encode_geohash(*coordinates[address])
+            for address in unassigned_orders_addresses
+            if address in coordinates
+        }
+    restaurant_ids_by_cell = get_restaurant_ids_by_cell(order_cells.values())
+
     order_items = []
 
     for order in orders:
@@ -181,29 +255,38 @@ def view_orders(request):
             order_products = order.orderproducts.all()
             product_names = {p.product.name for p in order_products}
 
+            order_cell = order_cells.get(order_address)
+            if order_cell:
+                candidate_restaurants = unzoned_restaurants + [
+                    restaurants_by_id[restaurant_id]
+                    for restaurant_id in restaurant_ids_by_cell[order_cell]
+                ]
+            else:
+                candidate_restaurants = restaurants
+
             capable_restaurants = []
 
-            for restaurant in restaurants:
+            for restaurant in candidate_restaurants:
                 restaurant_products = restaurant_products_map.get(restaurant.id, set())
 
-                distance_from_restaurant = None
-                restaurant_address = restaurant.address
-
-                if restaurant_address and order_address:
+                if product_names.issubset(restaurant_products):
                     distance_from_restaurant = distance_calculation(
-                        yandex_api_key,
-                        restaurant_address,
-                        order_address
+                        coordinates.get(restaurant.address),
+                        coordinates.get(order_address)
                     )
-
-                if product_names.issubset(restaurant_products):
+                    # Ячейки зоны берутся с запасом, поэтому радиус проверяем точно
+                    if (
+                        restaurant.delivery_radius and distance_from_restaurant is not None
+                        and distance_from_restaurant > restaurant.delivery_radius
+                    ):
+                        continue
                     capable_restaurants.append(
                         (restaurant.name, distance_from_restaurant)
                     )
 
             sorted_capable_restaurants = sorted(
                 capable_restaurants,
-                key=itemgetter(1, 0)
+                key=lambda restaurant: (restaurant[1] is None, restaurant[1] or 0, restaurant[0])
             )
 
             formatted_capable_restaurants = []
@@ -0,0 +1,19 @@
+"""
+ASGI config for Django project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Order intake and the catalogue are served by async views, see asgi_urls.py.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "star_burger.settings")
+os.environ.setdefault("ROOT_URLCONF", "star_burger.asgi_urls")
+# Синхронный ORM под ASGI работает в потоках, которые не закрывают постоянные
+# соединения в конце запроса, поэтому с CONN_MAX_AGE > 0 соединения утекают
+os.environ.setdefault("CONN_MAX_AGE", "0")
+application = get_asgi_application()
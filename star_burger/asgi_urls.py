@@ -0,0 +1,15 @@
+"""URL Configuration for the ASGI application.
+
+Same routes as star_burger.urls, but order intake and the catalogue are
+handled by async views.
+"""
+from django.urls import path
+
+from foodcartapp import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/products/', async_views.product_list_api),
+    path('api/order/', async_views.register_order),
+] + sync_urlpatterns
@@ -0,0 +1,85 @@
+"""Чтение из реплики БД.
+
+Запросы GET и HEAD читают из реплики, всё остальное и любые записи идут в
+default. После того как клиент что-то изменил, например менеджер
+отредактировал заказ в админке, его запросы ещё REPLICA_STICKY_SECONDS
+читают из default, чтобы он сразу увидел свои правки, даже если реплика
+отстаёт.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+REPLICA_DATABASE_ALIAS = 'replica'
+STICKY_COOKIE_NAME = 'read_from_primary'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Сессии и кэш координат пишутся и на GET-запросах, их читаем только из default
+PRIMARY_ONLY_APPS = {'sessions', 'geoinfostore'}
+
+read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not read_from_replica.get():
+            return None
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return REPLICA_DATABASE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DATABASE_ALIAS
+
+
+def can_read_from_replica(request):
+    return request.method in SAFE_METHODS and STICKY_COOKIE_NAME not in request.COOKIES
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения безопасных запросов в реплику"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = read_from_replica.set(can_read_from_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.stick_to_primary(request, response)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(can_read_from_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.stick_to_primary(request, response)
+
+    def stick_to_primary(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE_NAME,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
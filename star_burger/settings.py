@@ -12,8 +12,38 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 YANDEX_API_KEY = env('YANDEX_API_KEY')
 
+ORDER_ARCHIVE_AFTER_DAYS = env.int('ORDER_ARCHIVE_AFTER_DAYS', 30)
+ORDER_ARCHIVE_BATCH_SIZE = env.int('ORDER_ARCHIVE_BATCH_SIZE', 500)
+
+ORDER_INTAKE_BUFFER = env.bool('ORDER_INTAKE_BUFFER', False)
+ORDER_INTAKE_LOG_PATH = env('ORDER_INTAKE_LOG_PATH', os.path.join(BASE_DIR, 'order_intake.log'))
+
+ORDER_IDEMPOTENCY_KEY_TTL = env.int('ORDER_IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+ORDER_RATE_LIMIT_DB_PATH = env('ORDER_RATE_LIMIT_DB_PATH', os.path.join(BASE_DIR, 'rate_limit.sqlite3'))
+ORDER_IP_BUCKET_SIZE = env.int('ORDER_IP_BUCKET_SIZE', 20)
+ORDER_IP_REFILL_PER_MINUTE = env.float('ORDER_IP_REFILL_PER_MINUTE', 10)
+ORDER_PHONE_BUCKET_SIZE = env.int('ORDER_PHONE_BUCKET_SIZE', 5)
+ORDER_PHONE_REFILL_PER_MINUTE = env.float('ORDER_PHONE_REFILL_PER_MINUTE', 1)
+ORDER_ADMISSION_MAX_INTAKE_BACKLOG = env.int('ORDER_ADMISSION_MAX_INTAKE_BACKLOG', 10 * 1024 * 1024)
+ORDER_ADMISSION_MAX_DB_SECONDS = env.float('ORDER_ADMISSION_MAX_DB_SECONDS', 2)
+ORDER_ADMISSION_RETRY_AFTER = env.int('ORDER_ADMISSION_RETRY_AFTER', 5)
+
+BANNERS_MAX_AGE = env.int('BANNERS_MAX_AGE', 5 * 60)
+
+REQUEST_TIMING_SAMPLE_RATE = env.float('REQUEST_TIMING_SAMPLE_RATE', 1.0)
+REQUEST_TIMING_WINDOW = env.int('REQUEST_TIMING_WINDOW', 1000)
+
+METRICS_DB_PATH = env('METRICS_DB_PATH', os.path.join(BASE_DIR, 'metrics.sqlite3'))
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', 5)
+METRICS_TOKEN = env('METRICS_TOKEN', '')
+
+# Тесты пишут метрики и вёдра ограничения частоты во временные файлы, а не в рабочие
+TEST_RUNNER = 'metrics.test_runner.MetricsTestRunner'
+
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG', True)
+DEBUG_TOOLBAR = env.bool('DEBUG_TOOLBAR', DEBUG)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
@@ -26,13 +56,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'phonenumber_field',
     'rest_framework',
     'geoinfostore',
+    'metrics',
 ]
 
 MIDDLEWARE = [
+    'metrics.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -40,10 +71,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
-ROOT_URLCONF = 'star_burger.urls'
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+ROOT_URLCONF = env('ROOT_URLCONF', 'star_burger.urls')
 
 DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.versions.VersionsPanel',
@@ -79,16 +113,66 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'star_burger.wsgi.application'
+ASGI_APPLICATION = 'star_burger.asgi.application'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
 DATABASES = {
     'default': dj_database_url.config(
-        default='sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3'))
+        default='sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3')),
+        conn_max_age=env.int('CONN_MAX_AGE', 0 if DEBUG else 600),
+        conn_health_checks=True,
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Сколько секунд ждать, пока другой воркер отпустит блокировку на запись
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': env.float('SQLITE_BUSY_TIMEOUT', 20),
+    }
+    if env.bool('SQLITE_TUNING', True):
+        DATABASES['default']['OPTIONS'].update({
+            # Транзакция сразу берёт блокировку на запись, иначе при
+            # повышении блокировки SQLite падает, не дожидаясь таймаута
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join([
+                'PRAGMA journal_mode=WAL',
+                'PRAGMA synchronous={0}'.format(env('SQLITE_SYNCHRONOUS', 'NORMAL')),
+                'PRAGMA mmap_size={0}'.format(env.int('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+                'PRAGMA cache_size={0}'.format(env.int('SQLITE_CACHE_SIZE', -64 * 1024)),
+                'PRAGMA temp_store=MEMORY',
+            ]),
+        })
+
+REPLICA_DATABASE_URL = env('REPLICA_DATABASE_URL', '')
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', 10)
+
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=env.int('CONN_MAX_AGE', 0 if DEBUG else 600),
+        conn_health_checks=True,
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['star_burger.replica.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'star_burger.replica.ReplicaMiddleware')
+
+CACHES = {
+    'default': env.dj_cache_url(
+        'CACHE_URL',
+        'locmem://' if DEBUG else 'file://{0}'.format(os.path.join(BASE_DIR, 'cache')),
+    )
+}
+
+REST_FRAMEWORK = {
+    # Сколько прокси перед сайтом: по X-Forwarded-For от них ищется IP клиента
+    'NUM_PROXIES': env.int('NUM_PROXIES', 0),
+}
+
+if not DEBUG:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -116,6 +200,24 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'star_burger.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        # Хэши в именах статики требуют collectstatic, поэтому по умолчанию только в prod
+        'BACKEND': (
+            'star_burger.storage.CompressedManifestStaticFilesStorage'
+            if env.bool('STATIC_HASHED', not DEBUG)
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Отдавать статику и медиа самим Django, если перед ним нет nginx
+SERVE_FILES = env.bool('SERVE_FILES', False)
+HASHED_FILES_MAX_AGE = 365 * 24 * 60 * 60
+
 INTERNAL_IPS = [
     '127.0.0.1'
 ]
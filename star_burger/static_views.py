@@ -0,0 +1,40 @@
+import os
+import re
+
+from django.conf import settings
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+
+
+# Хэш содержимого в имени, как его ставят ManifestStaticFilesStorage и ContentAddressedStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+ENCODING_SUFFIXES = [
+    ('br', '.br'),
+    ('gzip', '.gz'),
+]
+
+
+def get_compressed_path(request, path, document_root):
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    for encoding, suffix in ENCODING_SUFFIXES:
+        if encoding in accept_encoding and os.path.exists(safe_join(document_root, path + suffix)):
+            return path + suffix
+    return path
+
+
+def serve_file(request, path, document_root):
+    """Отдаёт статику и медиа без отдельного веб-сервера
+
+    Если клиент принимает сжатые ответы, отдаёт готовую копию .br или .gz.
+    Файлы с хэшем в имени браузеру можно кэшировать навсегда, остальные —
+    только с перепроверкой.
+    """
+    response = serve(request, get_compressed_path(request, path, document_root), document_root)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if HASHED_NAME_RE.search(path):
+        patch_cache_control(response, public=True, max_age=settings.HASHED_FILES_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,84 @@
+"""Хранилища статики и медиа с адресами, которые меняются вместе с содержимым.
+
+Раз адрес файла меняется при каждом изменении, браузеры и CDN могут кэшировать
+его навсегда и не перепроверять при каждом заходе на сайт.
+"""
+import gzip
+import hashlib
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml'}
+
+
+def compress_file(path):
+    """Кладёт рядом с файлом сжатые копии .gz и, если установлен brotli, .br"""
+    with open(path, 'rb') as source_file:
+        content = source_file.read()
+
+    compressed_versions = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli  # необязательная зависимость
+    except ImportError:
+        pass
+    else:
+        compressed_versions['.br'] = brotli.compress(content)
+
+    for suffix, compressed_content in compressed_versions.items():
+        if len(compressed_content) >= len(content):
+            continue
+        with open(f'{path}{suffix}', 'wb') as compressed_file:
+            compressed_file.write(compressed_content)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Добавляет к именам статики хэш содержимого и сжимает файлы при collectstatic"""
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if os.path.splitext(hashed_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                compress_file(self.path(hashed_name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Называет загруженные файлы по хэшу содержимого: burger.3f2a9c1b7d4e.jpg
+
+    Одинаковые файлы хранятся один раз, а новый файл с тем же именем
+    получает новый адрес.
+    """
+    hash_length = 12
+    # Уменьшенные копии называются по имени исходника, в котором хэш уже есть
+    exact_name_dirs = ('thumbnails/',)
+
+    def get_content_hash(self, content):
+        content_hash = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            content_hash.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return content_hash.hexdigest()[:self.hash_length]
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if name.startswith(self.exact_name_dirs):
+            return super().save(name, content, max_length)
+
+        directory, filename = os.path.split(name)
+        stem, extension = os.path.splitext(filename)
+        hashed_name = os.path.join(
+            directory,
+            f'{stem}.{self.get_content_hash(content)}{extension}',
+        )
+        if self.exists(hashed_name):
+            return hashed_name
+        return super().save(hashed_name, content, max_length)